@@ -0,0 +1,90 @@
+"""Mémoire occupée par les comptes de la $wagChain™, à grand nombre
+d'utilisateurs.
+
+Chaque utilisateur crée son compte, mine une fois, et un sur deux bloque une
+partie de son $wag : les comptes ont alors les dates, soldes et taux qu'ils
+ont sur le bot. À lancer depuis la racine du dépôt, à côté du `config.json` :
+
+    python -m bench.bench_accounts --users 100000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from arrow import Arrow
+
+from swag.blockchain.blockchain import SwagChain
+from swag.blockchain.snapshot import load_snapshot, save_snapshot
+from swag.blocks import AccountCreation, Mining, SwagBlocking
+from swag.currencies import Swag
+from swag.id import UserId
+
+from .chain_generator import TIMEZONES
+
+
+def account_blocks(chain, users: int, seed: int = 0):
+    rng = random.Random(seed)
+    start = Arrow(2024, 1, 1)
+    for i in range(users):
+        user_id = 1000 + i
+        timestamp = start.shift(seconds=i)
+        yield AccountCreation(
+            timestamp=timestamp,
+            issuer_id=user_id,
+            user_id=user_id,
+            timezone=rng.choice(TIMEZONES),
+        )
+        yield Mining(
+            timestamp=timestamp.shift(hours=1),
+            issuer_id=user_id,
+            user_id=user_id,
+        )
+        # Le montant bloqué dépend du minage, exécuté entre-temps
+        balance = chain._accounts[UserId(user_id)].swag_balance.value
+        if i % 2 == 0 and balance > 1:
+            yield SwagBlocking(
+                timestamp=timestamp.shift(hours=2),
+                issuer_id=user_id,
+                user_id=user_id,
+                amount=Swag(rng.randint(1, balance // 2)),
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    chain = SwagChain([])
+    blocks = account_blocks(chain, args.users, args.seed)
+
+    # Les blocs sont jetés une fois exécutés : seuls les comptes restent
+    tracemalloc.start()
+    for block in blocks:
+        chain._run(block)
+    chain.update_growth_rates()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "accounts.snapshot")
+        save_snapshot({"accounts": chain._accounts}, path)
+        snapshot_size = os.path.getsize(path)
+        start = time.perf_counter()
+        load_snapshot(path)
+        load_time = time.perf_counter() - start
+
+    print(f"{args.users} comptes\n")
+    print(f"{'mémoire (octets/compte)':<32}{retained / args.users:>12,.1f}")
+    print(f"{'pic (octets/compte)':<32}{peak / args.users:>12,.1f}")
+    print(f"{'snapshot (octets/compte)':<32}{snapshot_size / args.users:>12,.1f}")
+    print(f"{'chargement du snapshot (ms)':<32}{load_time * 1000:>12,.1f}")
+
+
+if __name__ == "__main__":
+    main()
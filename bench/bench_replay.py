@@ -0,0 +1,118 @@
+"""Durée de l'import de l'historique du canal de la $wagChain™ au démarrage.
+
+Compare l'import en série, message après message, à l'import en pipeline,
+sur un canal simulé dont chaque requête prend `--latency` secondes. À lancer
+depuis la racine du dépôt, à côté du `config.json` :
+
+    python -m bench.bench_replay --users 200 --days 30 --latency 0.1
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import time
+
+import disnake
+
+from swag.blockchain.block_log import BlockLog
+from swag.blockchain.synced_blockchain import (
+    MESSAGE_MAX_LENGTH,
+    SyncedSwagChain,
+    message_payload,
+    read_message,
+)
+from swag.blockchain.wire_format import encode_block, text_length
+from swag.blocks import AssetUploadBlock
+
+from .chain_generator import generate_chain
+from .fake_channel import FakeChannel
+
+
+async def publish(channel, blocks):
+    """Publie les blocs en remplissant chaque message. Comme sur le bot, un
+    AssetUploadBlock est publié seul, avec son fichier."""
+    batch = []
+    size = 0
+    for block in blocks:
+        encoded_block = encode_block(block)
+        if isinstance(block, AssetUploadBlock):
+            if batch:
+                await channel.send(**message_payload(batch))
+            await channel.send(
+                **message_payload([encoded_block]),
+                file=disnake.File(io.BytesIO(b"avatar"), "avatar.png"),
+            )
+            batch = []
+            size = 0
+            continue
+        if batch and text_length(size + len(encoded_block)) > MESSAGE_MAX_LENGTH:
+            await channel.send(**message_payload(batch))
+            batch = []
+            size = 0
+        batch.append(encoded_block)
+        size += len(encoded_block)
+
+    if batch:
+        await channel.send(**message_payload(batch))
+
+
+def empty_chain(channel, directory):
+    chain = SyncedSwagChain([], 0)
+    chain._channel = channel
+    chain._log = BlockLog(os.path.join(directory, "swagchain.log"))
+    return chain
+
+
+async def serial_import(chain):
+    async for message in chain._channel.history(limit=None, oldest_first=True):
+        chain._import_message(message, await read_message(message))
+    chain._log.sync()
+
+
+async def measure(channel, import_channel):
+    with tempfile.TemporaryDirectory() as directory:
+        chain = empty_chain(channel, directory)
+        start = time.perf_counter()
+        await import_channel(chain)
+        elapsed = time.perf_counter() - start
+        chain._log._file.close()
+    return chain, elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    blocks = generate_chain(args.users, args.days)
+    channel = FakeChannel()
+    await publish(channel, blocks)
+    channel.latency = args.latency
+
+    serial_chain, serial_time = await measure(channel, serial_import)
+    pipelined_chain, pipelined_time = await measure(
+        channel, SyncedSwagChain._import_channel
+    )
+
+    # Les deux imports doivent aboutir à la même chaîne
+    assert [serial_chain._chain.encoded(seq) for seq in serial_chain._chain] == [
+        pipelined_chain._chain.encoded(seq) for seq in pipelined_chain._chain
+    ]
+
+    print(
+        f"{len(blocks)} blocs dans {len(channel.messages)} messages, "
+        f"latence {args.latency * 1000:.0f} ms\n"
+    )
+    print(f"{'':<12}{'série':>12}{'pipeline':>12}{'gain':>8}")
+    print(
+        f"{'import (s)':<12}{serial_time:>12.2f}{pipelined_time:>12.2f}"
+        f"{serial_time / pipelined_time:>7.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""Mémoire occupée par les blocs de la $wagChain™, et temps de chargement du
+snapshot, selon qu'ils sont gardés décodés ou encodés dans un BlockStore.
+
+À lancer depuis la racine du dépôt, à côté du `config.json` :
+
+    python -m bench.bench_store --users 200 --days 30
+"""
+
+import argparse
+import pickle
+import time
+import tracemalloc
+
+from swag.blockchain.block_store import BlockStore
+
+from .chain_generator import generate_chain
+
+
+def allocated(build):
+    """Octets alloués par `build` et toujours occupés par son résultat."""
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def load_time(obj, repeat):
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pickle.loads(data)
+        best = min(best, time.perf_counter() - start)
+    return len(data), best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    blocks = generate_chain(args.users, args.days)
+    store = BlockStore(enumerate(blocks))
+
+    # Copies fraîches des blocs, pour ne pas compter d'objets partagés
+    decoded, decoded_size = allocated(lambda: {seq: store[seq] for seq in store})
+    _, store_size = allocated(lambda: BlockStore(enumerate(decoded.values())))
+
+    decoded_pickle, decoded_load = load_time(decoded, args.repeat)
+    store_pickle, store_load = load_time(store, args.repeat)
+
+    print(f"{len(blocks)} blocs, {args.users} utilisateurs, {args.days} jours\n")
+    print(f"{'':<24}{'décodés':>12}{'encodés':>12}{'gain':>8}")
+    for label, before, after in (
+        ("mémoire (octets/bloc)", decoded_size / len(blocks), store_size / len(blocks)),
+        (
+            "snapshot (octets/bloc)",
+            decoded_pickle / len(blocks),
+            store_pickle / len(blocks),
+        ),
+        ("chargement (ms)", decoded_load * 1000, store_load * 1000),
+    ):
+        print(f"{label:<24}{before:>12,.1f}{after:>12,.1f}{before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Comparaison du format JSON et du format binaire des messages de la $wagChain™.
+
+Mesure la taille des blocs publiés, le nombre de blocs tenant dans le contenu
+d'un message, et le débit de la lecture des messages jusqu'aux blocs. À
+lancer depuis la racine du dépôt, à côté du `config.json` :
+
+    python -m bench.bench_wire --users 200 --days 30
+"""
+
+import argparse
+import json
+import time
+
+from swag.blockchain.blockchain_parser import structure_block, unstructure_block
+from swag.blockchain.synced_blockchain import MESSAGE_MAX_LENGTH
+from swag.blockchain.wire_format import (
+    encode_block,
+    from_text,
+    pack_payload,
+    text_length,
+    to_text,
+    unpack_payload,
+)
+
+from .chain_generator import generate_chain
+
+
+def blocks_per_message(sizes, message_length):
+    """Nombre moyen de blocs publiés par message plein."""
+    messages = 1
+    length = 0
+    for size in sizes:
+        if length and message_length(length + size) > MESSAGE_MAX_LENGTH:
+            messages += 1
+            length = 0
+        length += size
+    return len(sizes) / messages
+
+
+def measure(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    blocks = generate_chain(args.users, args.days)
+
+    json_blocks = [json.dumps(unstructure_block(block)) for block in blocks]
+    wire_blocks = [encode_block(block) for block in blocks]
+
+    json_content = "[" + ", ".join(json_blocks) + "]"
+    wire_content = to_text(pack_payload(wire_blocks))
+
+    # Les deux formats doivent publier exactement les mêmes blocs
+    for wire_block, block in zip(unpack_payload(from_text(wire_content)), blocks):
+        assert unstructure_block(wire_block) == unstructure_block(block)
+
+    json_time = measure(
+        lambda: [structure_block(u) for u in json.loads(json_content)], args.repeat
+    )
+    wire_time = measure(
+        lambda: unpack_payload(from_text(wire_content)),
+        args.repeat,
+    )
+
+    json_per_message = blocks_per_message(
+        [len(block) + 2 for block in json_blocks], lambda length: length
+    )
+    wire_per_message = blocks_per_message(
+        [len(block) for block in wire_blocks], lambda size: text_length(size + 3)
+    )
+
+    print(f"{len(blocks)} blocs, {args.users} utilisateurs, {args.days} jours\n")
+    print(f"{'':<20}{'JSON':>12}{'binaire':>12}{'gain':>8}")
+    for label, before, after in (
+        (
+            "octets/bloc",
+            len(json_content) / len(blocks),
+            len(wire_content) / len(blocks),
+        ),
+        ("blocs/message", json_per_message, wire_per_message),
+        ("lecture blocs/s", len(blocks) / json_time, len(blocks) / wire_time),
+    ):
+        print(f"{label:<20}{before:>12,.1f}{after:>12,.1f}{after / before:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""Génération de $wagChain™ réalistes, pour les mesures de performance.
+
+Les utilisateurs arrivent au fil du premier quart de la période, dans des
+fuseaux horaires variés. Chaque jour, la plupart minent à une heure de leur
+choix, certains bloquent une partie de leur $wag, et quelques transactions ont
+lieu, entre utilisateurs ou vers une €agnotte. De temps en temps, un
+utilisateur invoque une Yfu, et ceux qui en ont utilisent son pouvoir. Comme
+sur le bot, le $tyle est généré toutes les heures et les $wag bloqués sont
+rendus dès que possible.
+"""
+
+import random
+from typing import Dict, List
+
+from arrow import Arrow
+
+from swag.block import Block
+from swag.blockchain.blockchain import SwagChain
+from swag.blocks import (
+    AccountCreation,
+    AssetUploadBlock,
+    CagnotteCreation,
+    Mining,
+    ReturnOnInvestment,
+    StyleGeneration,
+    SwagBlocking,
+    Transaction,
+    UserTimezoneUpdate,
+    YfuGenerationBlock,
+    YfuPowerActivation,
+)
+from swag.currencies import Style, Swag
+from swag.id import CagnotteId, UserId, YfuId
+from swag.powers import HoldUp, Robbery, StockPortfolio, Takeover
+from swag.powers.power import Active
+from swag.stylog import unit_style_generation
+
+BOT_ID = UserId(0)
+START = Arrow(2024, 1, 1)
+TIMEZONES = ["Europe/Paris", "Europe/Paris", "UTC", "America/Montreal", "Asia/Tokyo"]
+CAGNOTTE_ID = CagnotteId("€pot")
+# Pouvoirs des Yfus générées : les actifs ciblent un seul utilisateur
+YFU_POWERS = [Robbery, HoldUp, Takeover, StockPortfolio]
+
+# Probabilités quotidiennes, par utilisateur
+MINING_PROBABILITY = 0.7
+BLOCKING_PROBABILITY = 0.3
+TRANSACTION_PROBABILITY = 0.5
+TIMEZONE_UPDATE_PROBABILITY = 0.005
+YFU_GENERATION_PROBABILITY = 0.02
+# Probabilité quotidienne, par Yfu
+YFU_ACTIVATION_PROBABILITY = 0.3
+# Part des transactions versées à la €agnotte
+CAGNOTTE_SHARE = 0.1
+
+
+def avatar_url(asset_key: str) -> str:
+    """Url, fictive, de l'avatar envoyé par un AssetUploadBlock."""
+    return f"https://cdn.example/avatars/{asset_key}.png"
+
+
+def _try_append(chain, block):
+    # Les blocs que la chaîne refuse, comme sur le bot, sont simplement perdus
+    try:
+        chain.append(block)
+    except Exception:
+        pass
+
+
+def _other_user(rng, user_ids, user_id):
+    # Tirage par rejet : construire la liste des autres utilisateurs coûterait
+    # autant que leur nombre, à chaque tirage
+    while (other := rng.choice(user_ids)) == user_id:
+        pass
+    return other
+
+
+def _yfu_generation(rng, chain, user_id):
+    power_class = rng.choice(YFU_POWERS)
+    power_points = rng.randint(1, 100)
+
+    def generation(timestamp):
+        yfu_id = YfuId(chain.next_yfu_id)
+        asset_key = f"{yfu_id}_avatar"
+        # Sur le bot, l'url n'est connue qu'une fois l'avatar envoyé
+        chain._assets[asset_key] = avatar_url(asset_key)
+        return [
+            AssetUploadBlock(
+                timestamp=timestamp,
+                issuer_id=user_id,
+                asset_key=asset_key,
+                local_path=f"ressources/Yfu/avatars/GEN_1/{yfu_id.id[1:]}.png",
+            ),
+            YfuGenerationBlock(
+                timestamp=timestamp,
+                issuer_id=user_id,
+                user_id=user_id,
+                yfu_id=yfu_id,
+                first_name=rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") + ".",
+                last_name="Yamada",
+                clan="🌸",
+                power_points=power_points,
+                initial_activation_cost=Style("0.002"),
+                avatar_asset_key=asset_key,
+                power=power_class(power_points),
+            ),
+        ]
+
+    return generation
+
+
+def _yfu_activation(chain, yfu_id, target_id):
+    def activation(timestamp):
+        yfu = chain._yfus[yfu_id]
+        # Le coût est prélevé avant l'activation : un bloc refusé à ce moment
+        # laisserait la chaîne dans un état que le rejeu ne retrouverait pas
+        if chain._accounts[yfu.owner_id].style_balance < yfu.cost:
+            return None
+        return YfuPowerActivation(
+            timestamp=timestamp,
+            issuer_id=yfu.owner_id,
+            account_id=yfu.owner_id,
+            yfu_id=yfu_id,
+            targets=[target_id],
+        )
+
+    return activation
+
+
+def _daily_events(rng, chain, user_ids):
+    """Blocs émis par les utilisateurs pendant une journée, par heure."""
+    events = {}
+
+    def at(hour, block_factory):
+        events.setdefault(hour, []).append(block_factory)
+
+    for user_id in user_ids:
+        hour = rng.randrange(24)
+        if rng.random() < MINING_PROBABILITY:
+            amount = Swag(rng.randint(1_000, 100_000))
+            at(
+                hour,
+                lambda timestamp, user_id=user_id, amount=amount: Mining(
+                    timestamp=timestamp,
+                    issuer_id=user_id,
+                    user_id=user_id,
+                    amount=amount,
+                ),
+            )
+
+        if rng.random() < BLOCKING_PROBABILITY:
+
+            def blocking(timestamp, user_id=user_id, share=rng.uniform(0.1, 0.5)):
+                account = chain._accounts[user_id]
+                return SwagBlocking(
+                    timestamp=timestamp,
+                    issuer_id=user_id,
+                    user_id=user_id,
+                    amount=Swag(int(account.swag_balance.value * share)),
+                )
+
+            at(rng.randrange(hour, 24), blocking)
+
+        if rng.random() < TRANSACTION_PROBABILITY:
+            recipient_id = (
+                CAGNOTTE_ID
+                if rng.random() < CAGNOTTE_SHARE
+                else _other_user(rng, user_ids, user_id)
+            )
+
+            def transaction(
+                timestamp,
+                user_id=user_id,
+                recipient_id=recipient_id,
+                share=rng.uniform(0.01, 0.05),
+            ):
+                account = chain._accounts[user_id]
+                return Transaction(
+                    timestamp=timestamp,
+                    issuer_id=user_id,
+                    giver_id=user_id,
+                    recipient_id=recipient_id,
+                    amount=Swag(max(1, int(account.swag_balance.value * share))),
+                )
+
+            at(rng.randrange(hour, 24), transaction)
+
+        if rng.random() < YFU_GENERATION_PROBABILITY:
+            at(rng.randrange(24), _yfu_generation(rng, chain, user_id))
+
+        if rng.random() < TIMEZONE_UPDATE_PROBABILITY:
+            timezone = rng.choice(TIMEZONES)
+            at(
+                rng.randrange(24),
+                lambda timestamp, user_id=user_id, timezone=timezone: (
+                    UserTimezoneUpdate(
+                        timestamp=timestamp,
+                        issuer_id=user_id,
+                        user_id=user_id,
+                        timezone=timezone,
+                    )
+                ),
+            )
+
+    for yfu_id, yfu in chain._yfus.items():
+        if (
+            isinstance(yfu.power, Active)
+            and yfu.owner_id in user_ids
+            and rng.random() < YFU_ACTIVATION_PROBABILITY
+        ):
+            target_id = _other_user(rng, user_ids, yfu.owner_id)
+            at(rng.randrange(24), _yfu_activation(chain, yfu_id, target_id))
+
+    return events
+
+
+def generate_chain(users: int, days: int, seed: int = 0) -> List[Block]:
+    """Blocs d'une $wagChain™ valide de `users` utilisateurs sur `days` jours."""
+    rng = random.Random(seed)
+    chain = SwagChain([])
+
+    all_user_ids = [UserId(user) for user in range(1, users + 1)]
+    # Le premier utilisateur est là dès le début, et crée la €agnotte
+    join_hours = [0] + sorted(
+        rng.randrange(max(1, days * 24 // 4)) for _ in all_user_ids[1:]
+    )
+    user_ids = []
+    events = {}
+
+    for hour in range(days * 24):
+        timestamp = START.shift(hours=hour)
+        end_of_hour = timestamp.shift(minutes=59)
+
+        while len(user_ids) < users and join_hours[len(user_ids)] <= hour:
+            user_id = all_user_ids[len(user_ids)]
+            chain.append(
+                AccountCreation(
+                    timestamp=timestamp,
+                    issuer_id=user_id,
+                    user_id=user_id,
+                    timezone=rng.choice(TIMEZONES),
+                )
+            )
+            user_ids.append(user_id)
+            if len(user_ids) == 1:
+                chain.append(
+                    CagnotteCreation(
+                        timestamp=timestamp,
+                        issuer_id=user_id,
+                        cagnotte_id=CAGNOTTE_ID,
+                        name="Pot commun",
+                        creator=user_id,
+                    )
+                )
+
+        if hour % 24 == 0 and len(user_ids) > 1:
+            events = _daily_events(rng, chain, user_ids)
+
+        for minute, block_factory in enumerate(events.get(hour % 24, [])):
+            blocks = block_factory(timestamp.shift(minutes=minute % 60))
+            for block in blocks if isinstance(blocks, list) else [blocks]:
+                if block is not None:
+                    _try_append(chain, block)
+
+        # Tâches horaires du bot
+        chain.append(
+            StyleGeneration(
+                timestamp=end_of_hour,
+                issuer_id=BOT_ID,
+                amounts={
+                    user_id: unit_style_generation(
+                        account.blocked_swag, account.style_rate
+                    )
+                    for user_id, account in chain._accounts.users.items()
+                    if account.blocked_swag.value > 0
+                },
+            )
+        )
+        for user_id, account in chain._accounts.users.items():
+            if (
+                account.unblocking_date is not None
+                and end_of_hour >= account.unblocking_date
+            ):
+                _try_append(
+                    chain,
+                    ReturnOnInvestment(
+                        timestamp=end_of_hour,
+                        issuer_id=BOT_ID,
+                        user_id=user_id,
+                        amount=account.pending_style,
+                    ),
+                )
+
+    return list(chain._chain.values())
+
+
+def known_assets(blocks: List[Block]) -> Dict[str, str]:
+    """Urls des avatars des Yfus générées dans ces blocs, qu'une chaîne doit
+    connaître pour les rejouer."""
+    return {
+        block.asset_key: avatar_url(block.asset_key)
+        for block in blocks
+        if isinstance(block, AssetUploadBlock)
+    }
+
+
+def replay_chain(blocks: List[Block]) -> SwagChain:
+    """Rejoue des blocs produits par `generate_chain` dans une nouvelle chaîne."""
+    chain = SwagChain([])
+    chain._assets.update(known_assets(blocks))
+    for block in blocks:
+        chain.append(block)
+    return chain
@@ -0,0 +1,196 @@
+"""Canal Discord simulé en mémoire, pour mesurer la $wagChain™ sans Discord."""
+
+import asyncio
+from collections import deque
+from datetime import timedelta
+from typing import Optional, Tuple
+
+import disnake
+
+# Discord renvoie l'historique d'un canal par pages de 100 messages
+HISTORY_PAGE_SIZE = 100
+# Limites de la suppression en masse
+BULK_DELETE_MAX_SIZE = 100
+BULK_DELETE_MAX_AGE = timedelta(days=14)
+
+
+class FakeResponse:
+    """Réponse HTTP minimale, pour construire les exceptions de disnake."""
+
+    def __init__(self, status: int, reason: str):
+        self.status = status
+        self.reason = reason
+
+
+def not_found():
+    return disnake.NotFound(FakeResponse(404, "Not Found"), "Unknown Message")
+
+
+class FakeAttachment:
+    def __init__(self, channel, message_id, filename, data):
+        self._channel = channel
+        self.filename = filename
+        self.url = f"https://cdn.example/{message_id}/{filename}"
+        self._data = data
+
+    async def read(self):
+        await self._channel._request()
+        return self._data
+
+
+class FakePartialMessage:
+    def __init__(self, channel, message_id):
+        self.channel = channel
+        self.id = message_id
+
+    async def edit(self, content=None, *, file=None, files=None, **kwargs):
+        await self.channel._request()
+        message = self.channel._get(self.id)
+
+        if content is not None:
+            message.content = content
+        if "attachments" in kwargs:
+            message.attachments = list(kwargs["attachments"])
+        message.attachments += self.channel._attachments(self.id, file, files)
+        return message
+
+    async def delete(self):
+        await self.channel._request()
+        self.channel._get(self.id)
+        del self.channel.messages[self.id]
+
+
+class FakeMessage(FakePartialMessage):
+    def __init__(self, channel, message_id, content, attachments):
+        super().__init__(channel, message_id)
+        self.content = content
+        self.attachments = attachments
+
+
+class FakeChannel:
+    """Canal qui garde ses messages en mémoire.
+
+    Chaque requête, l'envoi d'un message comme la lecture d'un fichier joint
+    ou d'une page d'historique, attend `latency` secondes. Avec `rate_limit`
+    (requêtes, secondes), les requêtes au-delà de la limite attendent que la
+    fenêtre se libère, comme disnake après une réponse 429.
+
+    Les ids des messages sont des snowflakes datés de l'envoi, décalé de
+    `time_shift` : des messages envoyés avec un décalage négatif sont vus
+    comme anciens par la suppression en masse.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        rate_limit: Optional[Tuple[int, float]] = None,
+        time_shift: timedelta = timedelta(),
+    ):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.time_shift = time_shift
+        self.messages = {}
+        # Nombre de requêtes, et de requêtes retardées par la limite
+        self.requests = 0
+        self.rate_limited = 0
+        self._request_times = deque()
+        self._last_id = 0
+
+    async def _request(self):
+        self.requests += 1
+
+        if self.rate_limit is not None:
+            loop = asyncio.get_running_loop()
+            limit, period = self.rate_limit
+            while True:
+                while (
+                    self._request_times
+                    and self._request_times[0] <= loop.time() - period
+                ):
+                    self._request_times.popleft()
+                if len(self._request_times) < limit:
+                    break
+                self.rate_limited += 1
+                await asyncio.sleep(self._request_times[0] + period - loop.time())
+            self._request_times.append(loop.time())
+
+        await asyncio.sleep(self.latency)
+
+    def _now(self):
+        return disnake.utils.utcnow() + self.time_shift
+
+    def _next_id(self):
+        self._last_id = max(
+            self._last_id + 1, disnake.utils.time_snowflake(self._now())
+        )
+        return self._last_id
+
+    def _get(self, message_id):
+        try:
+            return self.messages[message_id]
+        except KeyError:
+            raise not_found()
+
+    def _attachments(self, message_id, file, files):
+        return [
+            FakeAttachment(self, message_id, file.filename, file.fp.read())
+            for file in ([file] if file else []) + (files or [])
+        ]
+
+    async def send(self, content=None, *, file=None, files=None, **kwargs):
+        await self._request()
+
+        message_id = self._next_id()
+        self.messages[message_id] = FakeMessage(
+            self, message_id, content or "", self._attachments(message_id, file, files)
+        )
+        return self.messages[message_id]
+
+    def get_partial_message(self, message_id):
+        return FakePartialMessage(self, message_id)
+
+    async def fetch_message(self, message_id):
+        await self._request()
+        return self._get(message_id)
+
+    async def delete_messages(self, messages):
+        messages = list(messages)
+        if not messages:
+            return
+        if len(messages) == 1:
+            await self.get_partial_message(messages[0].id).delete()
+            return
+        if len(messages) > BULK_DELETE_MAX_SIZE:
+            raise disnake.ClientException(
+                "Can only bulk delete messages up to 100 messages"
+            )
+
+        await self._request()
+        bulk_limit = self._now() - BULK_DELETE_MAX_AGE
+        for message in messages:
+            if disnake.utils.snowflake_time(message.id) < bulk_limit:
+                raise disnake.HTTPException(
+                    FakeResponse(400, "Bad Request"),
+                    "You can only bulk delete messages that are under 14 days old.",
+                )
+            self._get(message.id)
+
+        for message in messages:
+            del self.messages[message.id]
+
+    async def history(self, limit=None, before=None, after=None, oldest_first=None):
+        message_ids = sorted(
+            message_id
+            for message_id in self.messages
+            if (before is None or message_id < before.id)
+            and (after is None or message_id > after.id)
+        )
+        if not oldest_first:
+            message_ids.reverse()
+
+        for i, message_id in enumerate(message_ids[:limit]):
+            if i % HISTORY_PAGE_SIZE == 0:
+                await self._request()
+            # Un message peut être supprimé pendant le parcours
+            if message_id in self.messages:
+                yield self.messages[message_id]
@@ -0,0 +1,218 @@
+"""Mesures de performance de la $wagChain™, enregistrées en JSON.
+
+Génère une chaîne réaliste, puis mesure le rejeu de ses blocs, la latence
+d'un ajout, le classement Forbes, la mise à jour des taux de croissance, la
+génération horaire du $tyle, et la mémoire occupée. Les résultats sont écrits
+dans `--output`, et comparés à ceux d'un commit précédent avec `--compare`.
+À lancer depuis la racine du dépôt, à côté du `config.json` :
+
+    python -m bench.suite --users 1000 --days 90 --output avant.json
+    python -m bench.suite --users 1000 --days 90 --compare avant.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import pickle
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from swag.blockchain.block_log import BlockLog
+from swag.blockchain.blockchain import SwagChain
+from swag.blockchain.synced_blockchain import SyncedSwagChain
+from swag.blocks import Mining
+
+from .chain_generator import generate_chain, known_assets, replay_chain
+from .fake_channel import FakeChannel
+
+
+def best_of(repeat, function):
+    """Meilleure durée, en secondes, de `repeat` appels à `function`."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def percentiles(durations):
+    durations = sorted(durations)
+    return {
+        "p50_us": durations[len(durations) // 2] * 1e6,
+        "p99_us": durations[len(durations) * 99 // 100] * 1e6,
+        "max_us": durations[-1] * 1e6,
+    }
+
+
+def measure_replay(blocks):
+    """Rejeu des blocs un par un, comme à la reconstruction de la chaîne."""
+    chain = SwagChain([])
+    chain._assets.update(known_assets(blocks))
+
+    durations = []
+    for block in blocks:
+        start = time.perf_counter()
+        chain.append(block)
+        durations.append(time.perf_counter() - start)
+
+    return chain, {
+        "blocks": len(blocks),
+        "seconds": sum(durations),
+        "blocks_per_second": len(blocks) / sum(durations),
+        "append": percentiles(durations),
+    }
+
+
+def measure_memory(blocks):
+    """Mémoire occupée par la chaîne rejouée, et taille de son snapshot."""
+    tracemalloc.start()
+    chain = replay_chain(blocks)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "retained_bytes": retained,
+        "peak_bytes": peak,
+        "retained_bytes_per_block": retained / len(blocks),
+        "snapshot_bytes": len(
+            pickle.dumps(chain.state(), protocol=pickle.HIGHEST_PROTOCOL)
+        ),
+    }
+
+
+def measure_queries(chain, repeat):
+    return {
+        "forbes_ms": best_of(repeat, lambda: chain.forbes) * 1000,
+        "update_growth_rates_ms": best_of(repeat, chain.update_growth_rates) * 1000,
+    }
+
+
+async def measure_synced(blocks, appends, repeat):
+    """Latence d'un ajout au bot, journal local compris, et coût de la
+    génération horaire du $tyle."""
+    with tempfile.TemporaryDirectory() as directory:
+        chain = SyncedSwagChain([], 0)
+        chain._channel = FakeChannel()
+        chain._log = BlockLog(os.path.join(directory, "swagchain.log"))
+        chain._assets.update(known_assets(blocks))
+        for block in blocks:
+            SwagChain.append(chain, block)
+        # Comme sur le bot, une fois la chaîne chargée
+        chain._accounts.enable_columns()
+
+        # Des minages, un par utilisateur et par jour, dont le montant est
+        # tiré à l'ajout comme sur le bot
+        user_ids = list(chain._accounts.users)
+        durations = []
+        for i in range(appends):
+            user_id = user_ids[i % len(user_ids)]
+            block = Mining(
+                timestamp=blocks[-1].timestamp.shift(days=1 + i // len(user_ids)),
+                issuer_id=user_id,
+                user_id=user_id,
+            )
+            start = time.perf_counter()
+            await chain.append(block)
+            durations.append(time.perf_counter() - start)
+
+        style_durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await chain.generate_style()
+            style_durations.append(time.perf_counter() - start)
+
+        chain._log._file.close()
+
+    return {
+        "append_logged": percentiles(durations),
+        "generate_style_ms": min(style_durations) * 1000,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results, prefix=""):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", value
+
+
+def compare(previous, current):
+    """Affiche chaque mesure à côté de celle d'un résultat précédent."""
+    previous_results = dict(flatten(previous["results"]))
+    print(f"\ncomparaison avec {previous.get('commit')}\n")
+    if previous["parameters"] != current["parameters"]:
+        print("attention : la chaîne mesurée n'était pas la même\n")
+    print(f"{'':<40}{'avant':>14}{'après':>14}{'ratio':>8}")
+    for key, value in flatten(current["results"]):
+        before = previous_results.get(key)
+        if not before or not isinstance(value, (int, float)):
+            continue
+        print(f"{key:<40}{before:>14,.1f}{value:>14,.1f}{value / before:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--appends", type=int, default=200)
+    parser.add_argument("--output", help="fichier JSON des résultats")
+    parser.add_argument("--compare", help="résultats JSON d'un commit précédent")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    blocks = generate_chain(args.users, args.days, args.seed)
+    generation_time = time.perf_counter() - start
+
+    chain, replay = measure_replay(blocks)
+    results = {
+        "generation_seconds": generation_time,
+        "replay": replay,
+        **measure_queries(chain, args.repeat),
+        **asyncio.run(measure_synced(blocks, args.appends, args.repeat)),
+        "memory": measure_memory(blocks),
+    }
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "parameters": {
+            "users": args.users,
+            "days": args.days,
+            "seed": args.seed,
+            "blocks": len(blocks),
+        },
+        "results": results,
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -162,3 +162,7 @@ async def on_message(message):
 
 # Lancement du client
 client.run(client_config.get("token"))
+
+# Le bot est arrêté
+for module in modules:
+    module.shutdown()
@@ -1,5 +1,9 @@
+from enum import Enum
+import io
+import json
 import disnake
 import time
+from swag.blockchain.profiler import BlockProfiler
 from swag.blocks.system_blocks import EventGiveaway
 from swag.client.ui.yfu_view import YfuEmbed
 from swag.currencies import Currency, get_money_class
@@ -25,6 +29,33 @@ class MaintenanceClient(Module):
         self.client.add_cog(AdminCommand(self.client, self.swag_module))
 
 
+class ProfilerAction(str, Enum):
+    SHOW = "afficher"
+    START = "activer"
+    STOP = "désactiver"
+    RESET = "réinitialiser"
+
+
+def profile_file(profiler: BlockProfiler):
+    return disnake.File(
+        io.BytesIO(json.dumps(profiler.report(), indent=2).encode()),
+        "block_profile.json",
+    )
+
+
+def profile_summary(profiler: BlockProfiler):
+    lines = [
+        f"{block_class:<22}{phase:<10}{stats['count']:>8} × "
+        f"{stats['mean_us']:>8.1f} µs (p99 {stats['p99_us']:>8.1f}) "
+        f"= {stats['total_ms']:>9.1f} ms"
+        for block_class, phase, stats in profiler.hottest()
+    ]
+    return (
+        f"Profilage depuis le {profiler.since.format('DD/MM/YYYY HH:mm')} :\n"
+        "```\n" + ("\n".join(lines) or "Aucun bloc ajouté") + "\n```"
+    )
+
+
 class AdminCommand(commands.Cog):
     def __init__(self, client: "Bot", swag_client: "SwagClient"):
         self.client = client
@@ -104,3 +135,46 @@ class AdminCommand(commands.Cog):
                 f"{interaction.author.mention}, **{new_yfu.first_name} {new_yfu.last_name}** a rejoint vos rangs à des fins de test !",
                 embed=YfuEmbed.from_yfu(new_yfu),
             )
+
+    @admin.sub_command(name="profil", guild_ids=[ADMIN_GUILD_ID])
+    async def profile(
+        self,
+        interaction: disnake.ApplicationCommandInteraction,
+        action: ProfilerAction = ProfilerAction.SHOW,
+        memoire: bool = False,
+    ):
+        """Profile l'ajout des blocs à la $wagChain, par type de bloc
+
+        Parameters
+        ----------
+        action : Par défaut, affiche les phases (validate, execute, index, persist) les plus coûteuses.
+        memoire : À l'activation, mesure aussi la mémoire allouée. Ralentit nettement le bot !
+        """
+        swagchain = self.swag_client.swagchain
+        profiler = swagchain._profiler
+
+        if action == ProfilerAction.START:
+            if profiler is not None:
+                profiler.stop()
+            swagchain._profiler = BlockProfiler(allocations=memoire)
+            await interaction.send("Profilage de la $wagChain activé !")
+            return
+
+        if profiler is None:
+            await interaction.send("Le profilage de la $wagChain n'est pas activé.")
+            return
+
+        if action == ProfilerAction.RESET:
+            profiler.reset()
+            await interaction.send("Profilage de la $wagChain réinitialisé !")
+        elif action == ProfilerAction.STOP:
+            swagchain._profiler = None
+            # Le rapport est construit avant l'arrêt du profileur : une fois
+            # arrêté, il n'y inclut plus la mémoire allouée
+            report = profile_file(profiler)
+            profiler.stop()
+            await interaction.send("Profilage de la $wagChain désactivé !", file=report)
+        else:
+            await interaction.send(
+                profile_summary(profiler), file=profile_file(profiler)
+            )
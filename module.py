@@ -11,3 +11,6 @@ class Module:
 
     async def process(self, message):
         pass
+
+    def shutdown(self):
+        pass
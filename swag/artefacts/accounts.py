@@ -1,14 +1,19 @@
 from __future__ import annotations
+from copy import deepcopy
+from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Any, Dict, Optional, Union, List, Set
+from typing import Any, Dict, Iterable, Optional, Tuple, Union, List, Set
 from attr import Factory, attrs, attrib
 import arrow
 from arrow import Arrow
+from dateutil.tz import UTC
 from itertools import chain
 from swag.artefacts.bonuses import Bonuses
+from swag.artefacts.columns import AccountColumns
+from swag.artefacts.ranking import ForbesRanking
 from swag.cauchy import roll
 
-from swag.id import CagnotteId, UserId, YfuId
+from swag.id import AccountId, CagnotteId, UserId, YfuId
 from swag.powers.power import Passive
 from swag.assert_timezone import assert_timezone
 from swag.yfu import Yfu
@@ -35,12 +40,104 @@ if TYPE_CHECKING:
     from swag.artefacts.services import Service, ServiceTransaction
 
 
-@attrs(auto_attribs=True)
+def _update_ranking(account, attribute, swag):
+    # Le classement Forbes suit chaque changement du solde d'un utilisateur,
+    # qu'il passe par += ou par une affectation directe
+    if account._ranking is not None:
+        account._ranking.update(account._rank_order, swag.value)
+    return swag
+
+
+def _update_columns(account, attribute, value):
+    # Les colonnes, si elles sont tenues, suivent les $wag bloqués et le taux
+    # de croissance de l'utilisateur
+    if account._columns is not None:
+        if attribute.name == "blocked_swag":
+            account._columns.blocked_swag[account._row] = value.value
+        else:
+            account._columns.style_rate[account._row] = float(value)
+    return value
+
+
+# Les dates des comptes sont gardées en microsecondes depuis l'epoch, bien
+# plus compactes que des objets Arrow ou datetime
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_epoch(date: Union[Arrow, datetime, None]) -> Optional[int]:
+    if date is None:
+        return None
+    if isinstance(date, Arrow):
+        date = date.datetime
+    return (date - _EPOCH) // _MICROSECOND
+
+
+def from_epoch(microseconds: Optional[int]) -> Optional[datetime]:
+    if microseconds is None:
+        return None
+    return _EPOCH + timedelta(microseconds=microseconds)
+
+
+def _utc_date(name: str) -> property:
+    # Date lue et écrite comme un datetime UTC, et gardée dans `name`
+    def fget(account):
+        return from_epoch(getattr(account, name))
+
+    def fset(account, date):
+        setattr(account, name, to_epoch(date))
+
+    return property(fget, fset)
+
+
+# Bonus des comptes qui n'ont ni ¥fu ni service, partagés
+NO_BONUSES = Bonuses()
+
+
+def _lazy_set_key(value):
+    # Un ensemble jamais créé vaut un ensemble vide
+    return value or frozenset()
+
+
+@attrs(auto_attribs=True, slots=True)
 class Account:
-    swag_balance: Swag = attrib(init=False, default=Swag(0))
+    swag_balance: Swag = attrib(init=False, default=Swag(0), on_setattr=_update_ranking)
     style_balance: Style = attrib(init=False, default=Style(0))
-    yfu_wallet: Set[YfuId] = attrib(init=False, factory=set)
-    subscribed_services: Set[Service] = attrib(init=False, factory=set)
+    # Ensembles créés au premier accès : la plupart des comptes n'ont ni ¥fu
+    # ni service
+    _yfu_wallet: Optional[Set[YfuId]] = attrib(
+        init=False, default=None, eq=_lazy_set_key
+    )
+    _subscribed_services: Optional[Set[Service]] = attrib(
+        init=False, default=None, eq=_lazy_set_key
+    )
+    # Classement où figure le compte, s'il y figure, et sa clef dans celui-ci
+    _ranking: Optional[ForbesRanking] = attrib(
+        init=False, default=None, eq=False, repr=False
+    )
+    _rank_order: int = attrib(init=False, default=0, eq=False, repr=False)
+    # Derniers bonus calculés, avec l'époque des bonus à laquelle ils l'ont été
+    _bonuses: Optional[Tuple[int, Bonuses]] = attrib(
+        init=False, default=None, eq=False, repr=False
+    )
+
+    @property
+    def yfu_wallet(self) -> Set[YfuId]:
+        if self._yfu_wallet is None:
+            self._yfu_wallet = set()
+        return self._yfu_wallet
+
+    @property
+    def subscribed_services(self) -> Set[Service]:
+        if self._subscribed_services is None:
+            self._subscribed_services = set()
+        return self._subscribed_services
+
+    @property
+    def has_bonus_sources(self) -> bool:
+        """Vrai si le compte a des ¥fus ou des services, seuls à pouvoir lui
+        donner des bonus."""
+        return bool(self._yfu_wallet or self._subscribed_services)
 
     def __iadd__(self, value: Union[Swag, Style]):
         if type(value) is Swag:
@@ -93,7 +190,28 @@ class Account:
         return self.bonuses(chain).roll()["result"]
 
     def bonuses(self, chain, **kwargs):
-        bonuses = Bonuses(**kwargs)
+        """Bonus du compte, apportés par ses ¥fus et celles qu'il loue.
+
+        Sans `kwargs`, les bonus sont gardés jusqu'au prochain changement des
+        ¥fus ou des services de la chaîne : l'objet renvoyé est alors partagé
+        et ne doit pas être modifié.
+        """
+        if kwargs:
+            return self._compute_bonuses(chain, Bonuses(**kwargs))
+
+        if not self.has_bonus_sources:
+            # Sans ¥fu ni service, tous les comptes partagent les bonus de base
+            self._bonuses = None
+            return NO_BONUSES
+
+        epoch = chain._accounts.bonus_epoch
+        if self._bonuses is None or self._bonuses[0] != epoch:
+            self._bonuses = (epoch, self._compute_bonuses(chain, Bonuses()))
+        return self._bonuses[1]
+
+    def _compute_bonuses(self, chain, bonuses: Bonuses) -> Bonuses:
+        if not self.has_bonus_sources:
+            return bonuses
 
         # De base, récupère les yfu du compte
         all_yfu_id = self.yfu_wallet.copy()
@@ -126,17 +244,46 @@ class Account:
 # ------------------------------------#
 
 
-@attrs(auto_attribs=True)
+@attrs(auto_attribs=True, slots=True)
 class SwagAccount(Account):
-    creation_date: Arrow
+    _creation_date: int = attrib(converter=to_epoch)
     timezone: str = attrib(validator=assert_timezone)
-    last_mining_date: Optional[Arrow] = None
-    style_rate: Decimal = Decimal(100)
-    blocked_swag: Swag = Swag(0)
-    blocking_date: Optional[Arrow] = None
-    unblocking_date: Optional[Arrow] = None
+    style_rate: Decimal = attrib(default=Decimal(100), on_setattr=_update_columns)
+    blocked_swag: Swag = attrib(default=Swag(0), on_setattr=_update_columns)
     pending_style: Style = Style(0)
-    timezone_lock_date: Optional[Arrow] = None
+    # Dates en microsecondes depuis l'epoch, lues par les propriétés du même
+    # nom. Le dernier minage garde aussi son fuseau, qui décide de son jour.
+    _last_mining_date: Optional[int] = attrib(init=False, default=None)
+    _last_mining_tz: Any = attrib(init=False, default=None, repr=False)
+    _blocking_date: Optional[int] = attrib(init=False, default=None)
+    _unblocking_date: Optional[int] = attrib(init=False, default=None)
+    _timezone_lock_date: Optional[int] = attrib(init=False, default=None)
+    # Colonnes où figure le compte, si elles sont tenues, et sa ligne
+    _columns: Optional[AccountColumns] = attrib(
+        init=False, default=None, eq=False, repr=False
+    )
+    _row: int = attrib(init=False, default=0, eq=False, repr=False)
+
+    blocking_date = _utc_date("_blocking_date")
+    unblocking_date = _utc_date("_unblocking_date")
+    timezone_lock_date = _utc_date("_timezone_lock_date")
+
+    @property
+    def creation_date(self) -> Arrow:
+        return Arrow.fromdatetime(from_epoch(self._creation_date))
+
+    @property
+    def last_mining_date(self) -> Optional[Arrow]:
+        if self._last_mining_date is None:
+            return None
+        return Arrow.fromdatetime(
+            from_epoch(self._last_mining_date).astimezone(self._last_mining_tz)
+        )
+
+    @last_mining_date.setter
+    def last_mining_date(self, date: Optional[Arrow]):
+        self._last_mining_date = to_epoch(date)
+        self._last_mining_tz = None if date is None else date.tzinfo
 
 
 class SwagAccountDict(dict):
@@ -157,7 +304,7 @@ class CagnotteRank:
     members: List[AccountId] = attrib(factory=list)
 
 
-@attrs(auto_attribs=True)
+@attrs(auto_attribs=True, slots=True)
 class CagnotteAccount(Account):
     name: str
     managers: List[UserId]
@@ -202,10 +349,85 @@ class Accounts:
     cagnottes: Dict[CagnotteId, CagnotteAccount] = attrib(
         init=False, factory=CagnotteAccountDict
     )
+    forbes: ForbesRanking = attrib(init=False, factory=ForbesRanking)
+    # Colonnes NumPy des utilisateurs, tenues seulement si elles sont activées
+    columns: Optional[AccountColumns] = attrib(init=False, default=None)
+    # Incrémentée à chaque changement qui peut modifier les bonus d'un compte
+    bonus_epoch: int = attrib(init=False, default=0)
+
+    def invalidate_bonuses(self):
+        """Oublie les bonus gardés par tous les comptes."""
+        self.bonus_epoch += 1
+
+    def enable_columns(self):
+        """Tient désormais à jour les colonnes des utilisateurs."""
+        if self.columns is not None:
+            return
+
+        self.columns = AccountColumns()
+        for user_id, account in self.users.items():
+            account._columns = self.columns
+            account._row = self.columns.add(user_id, account)
+
+    def checkpoint(self, keys: Iterable[AccountId]):
+        """Copie des comptes `keys`, du classement et des colonnes, que
+        `rollback` rétablit. Les autres comptes ne sont pas copiés."""
+        # Les copies partagent le classement et les colonnes des comptes, et
+        # les services, que d'autres comptes désignent aussi
+        memo = {id(self.forbes): self.forbes, id(self.columns): self.columns}
+        for key in keys:
+            if key in self:
+                account = self[key]
+                services = list(account._subscribed_services or ())
+                if type(key) is CagnotteId:
+                    services += account.services
+                memo.update((id(service), service) for service in services)
+        return (
+            {key: deepcopy(self[key], memo) if key in self else None for key in keys},
+            self.forbes.checkpoint(),
+            self.columns.checkpoint() if self.columns is not None else None,
+            self.bonus_epoch,
+        )
+
+    def rollback(self, checkpoint):
+        accounts, forbes, columns, self.bonus_epoch = checkpoint
+        for key, account in accounts.items():
+            accounts_dict = self.users if type(key) is UserId else self.cagnottes
+            # Le compte modifié par le groupe ne touche plus au classement ni
+            # aux colonnes
+            previous = accounts_dict.get(key)
+            if type(key) is UserId and previous is not None:
+                previous._ranking = None
+                previous._columns = None
+
+            if account is None:
+                accounts_dict.pop(key, None)
+            else:
+                accounts_dict[key] = account
+
+        self.forbes.rollback(forbes)
+        if columns is not None:
+            self.columns.rollback(columns)
 
     def __setitem__(self, key, item):
         if type(key) is UserId:
+            previous = self.users.get(key)
+            if previous is not None:
+                self._unrank(previous)
             self.users[key] = item
+            item._ranking = self.forbes
+            item._rank_order = self.forbes.add(key, item.swag_balance.value)
+
+            if self.columns is not None:
+                # Un compte remplacé garde sa ligne, comme sa place parmi les
+                # comptes
+                if previous is not None:
+                    previous._columns = None
+                    item._row = previous._row
+                    self.columns.set(item._row, item)
+                else:
+                    item._row = self.columns.add(key, item)
+                item._columns = self.columns
         elif type(key) is CagnotteId:
             self.cagnottes[key] = item
         else:
@@ -221,12 +443,25 @@ class Accounts:
 
     def __delitem__(self, key):
         if type(key) is UserId:
+            self._unrank(self.users[key])
+            if self.columns is not None:
+                self._remove_row(self.users[key])
             del self.users[key]
         elif type(key) is CagnotteId:
             del self.cagnottes[key]
         else:
             raise KeyError("Account ID should be of type UserId or CagnotteId")
 
+    def _unrank(self, account):
+        self.forbes.remove(account._rank_order)
+        account._ranking = None
+
+    def _remove_row(self, account):
+        self.columns.remove(account._row)
+        for user_id in self.columns.user_ids[account._row :]:
+            self.users[user_id]._row -= 1
+        account._columns = None
+
     def __contains__(self, key):
         return (type(key) is UserId and key in self.users) or (
             type(key) is CagnotteId and key in self.cagnottes
@@ -1,7 +1,6 @@
 from decimal import Decimal
 from attr import attrs
-from swag.cauchy import roll
-
+from swag.cauchy import roll, roll_array
 
 SWAG_BASE = 1000
 SWAG_LUCK = 100000
@@ -25,6 +24,24 @@ class Bonuses:
             "details": {"multiplier": self.multiplier, "avantages": avantage_rolls},
         }
 
+    def roll_many(self, n: int):
+        """`n` résultats de `roll`, tirés d'un seul coup, dans l'ordre où
+        `roll` les aurait tirés un à un."""
+        draws = roll_array(self.base, self.luck, n * self.avantage).reshape(
+            n, self.avantage
+        )
+
+        return [
+            {
+                "result": self.multiplier * int(best),
+                "details": {
+                    "multiplier": self.multiplier,
+                    "avantages": [int(draw) for draw in avantage_draws],
+                },
+            }
+            for best, avantage_draws in zip(draws.max(axis=1).tolist(), draws.tolist())
+        ]
+
     def unit_roll(self):
         return roll(self.base, self.luck)
 
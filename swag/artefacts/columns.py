@@ -0,0 +1,56 @@
+from typing import List
+
+import numpy as np
+
+from swag.id import UserId
+
+
+class AccountColumns:
+    """Copie en colonnes NumPy des $wag bloqués et des taux de croissance des
+    utilisateurs, pour les calculs horaires qui portent sur tous les comptes.
+
+    Les lignes suivent l'ordre des comptes. Les comptes tiennent eux-mêmes
+    leur ligne à jour à chaque changement de ces valeurs.
+    """
+
+    def __init__(self):
+        self.user_ids: List[UserId] = []
+        self._blocked_swag = np.zeros(16)
+        self._style_rate = np.zeros(16)
+
+    @property
+    def blocked_swag(self) -> np.ndarray:
+        return self._blocked_swag[: len(self.user_ids)]
+
+    @property
+    def style_rate(self) -> np.ndarray:
+        return self._style_rate[: len(self.user_ids)]
+
+    def add(self, user_id: UserId, account) -> int:
+        """Ajoute la ligne d'un compte, et renvoie son numéro."""
+        row = len(self.user_ids)
+        if row == len(self._blocked_swag):
+            self._blocked_swag = np.resize(self._blocked_swag, 2 * row)
+            self._style_rate = np.resize(self._style_rate, 2 * row)
+
+        self.user_ids.append(user_id)
+        self.set(row, account)
+        return row
+
+    def set(self, row: int, account):
+        self._blocked_swag[row] = account.blocked_swag.value
+        self._style_rate[row] = float(account.style_rate)
+
+    def checkpoint(self):
+        """Copie des colonnes, que `rollback` rétablit."""
+        return list(self.user_ids), self._blocked_swag.copy(), self._style_rate.copy()
+
+    def rollback(self, checkpoint):
+        self.user_ids, self._blocked_swag, self._style_rate = checkpoint
+
+    def remove(self, row: int):
+        """Retire une ligne : les lignes suivantes remontent d'un cran."""
+        size = len(self.user_ids)
+        self._blocked_swag[row : size - 1] = self._blocked_swag[row + 1 : size]
+        self._style_rate[row : size - 1] = self._style_rate[row + 1 : size]
+        del self.user_ids[row]
@@ -0,0 +1,61 @@
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from swag.id import UserId
+
+
+class ForbesRanking:
+    """Classement des utilisateurs par $wag, du plus riche au moins riche.
+
+    Le classement est tenu à jour à chaque changement de solde, plutôt que
+    trié à chaque lecture. À égalité de $wag, le compte ajouté le premier
+    passe devant, comme avec un tri stable des comptes.
+    """
+
+    def __init__(self):
+        # (-$wag, ordre d'ajout, utilisateur), triés
+        self._entries: List[Tuple[int, int, UserId]] = []
+        # Ordre d'ajout -> entrée du compte
+        self._by_order: Dict[int, Tuple[int, int, UserId]] = {}
+        self._next_order = 0
+
+    def add(self, user_id: UserId, swag: int) -> int:
+        """Classe un nouveau compte, et renvoie son ordre d'ajout, qui
+        l'identifie ensuite."""
+        order = self._next_order
+        self._next_order += 1
+        entry = (-swag, order, user_id)
+        insort(self._entries, entry)
+        self._by_order[order] = entry
+        return order
+
+    def remove(self, order: int):
+        entry = self._by_order.pop(order)
+        del self._entries[bisect_left(self._entries, entry)]
+
+    def update(self, order: int, swag: int):
+        entry = self._by_order[order]
+        if entry[0] == -swag:
+            return
+
+        del self._entries[bisect_left(self._entries, entry)]
+        entry = (-swag, order, entry[2])
+        insort(self._entries, entry)
+        self._by_order[order] = entry
+
+    def checkpoint(self):
+        """Copie du classement, que `rollback` rétablit."""
+        return list(self._entries), dict(self._by_order), self._next_order
+
+    def rollback(self, checkpoint):
+        self._entries, self._by_order, self._next_order = checkpoint
+
+    @property
+    def first(self) -> Optional[UserId]:
+        return self._entries[0][2] if self._entries else None
+
+    def __iter__(self) -> Iterator[UserId]:
+        return (user_id for _, _, user_id in self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -282,31 +282,42 @@ class Service:
                 swagchain, block, account_client, self
             )
             if transaction is not None:
-
-                service_transaction = ServiceTransaction(
-                    service=self,
-                    payment=payment,
-                    transaction=transaction,
+                service_transactions.append(
+                    ServiceTransaction(
+                        service=self,
+                        payment=payment,
+                        transaction=transaction,
+                    )
                 )
-                try:
-                    await swagchain.append(transaction)
-                    service_transactions.append(service_transaction)
-                except (NotEnoughSwagInBalance, NotEnoughStyleInBalance):
-                    # Si le paiement ne peut pas être effectué, on annule la subscription
-                    self.cancel(swagchain, account_client)
-                    service_transaction.success = False
-                    service_transactions.append(service_transaction)
-                    break
+
+        # Les paiements d'un même service sont prélevés d'un seul tenant
+        try:
+            await swagchain.append_many(
+                [
+                    service_transaction.transaction
+                    for service_transaction in service_transactions
+                ]
+            )
+        except (NotEnoughSwagInBalance, NotEnoughStyleInBalance):
+            # Si un paiement ne peut pas être effectué, aucun n'est prélevé et
+            # on annule la subscription. L'état de la chaîne ayant pu être
+            # restauré, on passe par le service tel qu'il est dans la chaîne.
+            services = swagchain._accounts[self.cagnotte_id].services
+            services[services.index(self)].cancel(swagchain, account_client)
+            for service_transaction in service_transactions:
+                service_transaction.success = False
 
         return service_transactions
 
     def execute(self, swagchain: SwagChain, account_client: AccountId):
         swagchain._accounts[account_client].subscribed_services.add(self)
         self.beneficiaries.append(account_client)
+        swagchain._accounts.invalidate_bonuses()
 
     def cancel(self, swagchain: SwagChain, account_client: AccountId):
         swagchain._accounts[account_client].subscribed_services.remove(self)
         self.beneficiaries.remove(account_client)
+        swagchain._accounts.invalidate_bonuses()
 
     def __hash__(self):
         return hash((self.cagnotte_id, self.name))
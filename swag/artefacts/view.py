@@ -0,0 +1,29 @@
+class ArtefactView:
+    """Vue en lecture seule d'un artefact de la $wagChain™ : compte, €agnotte
+    ou ¥fu.
+
+    Les attributs sont lus sur l'artefact au moment de l'accès : la vue n'est
+    jamais périmée, et peut être gardée tant que l'artefact existe.
+    `isinstance` la voit comme un objet de la classe de l'artefact.
+    """
+
+    __slots__ = ("_artefact",)
+
+    def __init__(self, artefact):
+        object.__setattr__(self, "_artefact", artefact)
+
+    def __getattr__(self, name):
+        return getattr(self._artefact, name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{name} est en lecture seule")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{name} est en lecture seule")
+
+    @property
+    def __class__(self):
+        return type(self._artefact)
+
+    def __repr__(self):
+        return f"ArtefactView({self._artefact!r})"
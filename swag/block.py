@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterable, Optional
 
-from swag.id import UserId
+from swag.id import AccountId, UserId
 
 if TYPE_CHECKING:
     from blockchain import SwagChain
@@ -17,6 +17,15 @@ class Block:
     timestamp = attrib(type=Arrow, converter=arrow.get, factory=utcnow)
     issuer_id = attrib(type=UserId, converter=UserId)
 
+    # Les blocs qui peuvent changer les bonus d'un compte (¥fus, services) les
+    # font recalculer après leur exécution
+    changes_bonuses = False
+
+    def touched_accounts(self) -> Optional[Iterable[AccountId]]:
+        """Comptes que le bloc peut modifier, ou None s'ils ne sont pas connus
+        avant son exécution."""
+        return None
+
     def validate(self, db: SwagChain):
         pass
 
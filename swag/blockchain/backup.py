@@ -0,0 +1,193 @@
+import gzip
+import heapq
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import cbor2
+
+BACKUP_DIR = "swagchain_backups"
+MANIFEST_NAME = "manifest.json"
+
+# Nombre de sauvegardes incrémentales entre deux sauvegardes complètes
+INCREMENTALS_PER_ROLLUP = 6
+# Nombre de sauvegardes complètes conservées, avec leurs incréments
+KEPT_ROLLUPS = 2
+
+
+def _write_file(path: str, data: bytes):
+    # Écrit à côté puis renommé, pour ne jamais laisser de fichier à moitié
+    # écrit
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(tmp_path, path)
+
+
+def load_manifest(directory: str = BACKUP_DIR) -> Dict[str, Any]:
+    """Manifeste des sauvegardes : segments écrits et point atteint dans le
+    journal par la dernière sauvegarde."""
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as manifest_file:
+            return json.load(manifest_file)
+    except FileNotFoundError:
+        return {"log_id": None, "log_offset": 0, "next_segment": 0, "segments": []}
+
+
+def last_rollup(manifest: Dict[str, Any]) -> Optional[int]:
+    """Position dans le manifeste de la dernière sauvegarde complète."""
+    for i in range(len(manifest["segments"]) - 1, -1, -1):
+        if manifest["segments"][i]["kind"] == "full":
+            return i
+    return None
+
+
+def write_segment(
+    manifest: Dict[str, Any],
+    kind: str,
+    blocks: Iterable[Tuple[int, Dict[str, Any]]],
+    removed: List[int],
+    assets: Dict[str, str],
+    log_id: Optional[str],
+    log_offset: int,
+    directory: str = BACKUP_DIR,
+):
+    """Ajoute un segment aux sauvegardes puis met à jour le manifeste.
+
+    Un segment complet contient tous les blocs de la chaîne, un segment
+    incrémental les blocs ajoutés et les numéros de séquence des blocs
+    retirés depuis le segment précédent. Le segment est un flux gzip d'objets
+    CBOR : un en-tête, puis un objet par bloc, écrit au fur et à mesure que
+    `blocks` est parcouru.
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    segment_name = f"{manifest['next_segment']:06d}-{kind}.cbor.gz"
+    segment_path = os.path.join(directory, segment_name)
+    tmp_path = f"{segment_path}.tmp"
+
+    with open(tmp_path, "wb") as raw_file:
+        with gzip.GzipFile(fileobj=raw_file, mode="wb") as segment_file:
+            encoder = cbor2.CBOREncoder(segment_file)
+            encoder.encode(
+                {
+                    "kind": kind,
+                    "log_id": log_id,
+                    "assets": assets,
+                    "removed": removed,
+                }
+            )
+            for seq, block in blocks:
+                encoder.encode([seq, block])
+        raw_file.flush()
+        os.fsync(raw_file.fileno())
+
+    os.replace(tmp_path, segment_path)
+
+    segments = manifest["segments"] + [{"file": segment_name, "kind": kind}]
+
+    # Seules les KEPT_ROLLUPS dernières sauvegardes complètes sont conservées
+    rollups = [i for i, segment in enumerate(segments) if segment["kind"] == "full"]
+    dropped_segments = []
+    if len(rollups) > KEPT_ROLLUPS:
+        first_kept = rollups[-KEPT_ROLLUPS]
+        dropped_segments, segments = segments[:first_kept], segments[first_kept:]
+
+    manifest = {
+        "log_id": log_id,
+        "log_offset": log_offset,
+        "next_segment": manifest["next_segment"] + 1,
+        "segments": segments,
+    }
+    _write_file(
+        os.path.join(directory, MANIFEST_NAME),
+        json.dumps(manifest, indent=2).encode(),
+    )
+
+    for segment in dropped_segments:
+        os.remove(os.path.join(directory, segment["file"]))
+
+    return manifest
+
+
+def relink_manifest(
+    manifest: Dict[str, Any],
+    log_id: str,
+    log_offset: int,
+    directory: str = BACKUP_DIR,
+) -> Dict[str, Any]:
+    """Rattache les sauvegardes au journal `log_id` qui remplace le leur : la
+    prochaine sauvegarde incrémentale le lira à partir de `log_offset`."""
+    manifest = {**manifest, "log_id": log_id, "log_offset": log_offset}
+    _write_file(
+        os.path.join(directory, MANIFEST_NAME),
+        json.dumps(manifest, indent=2).encode(),
+    )
+    return manifest
+
+
+def _segment_records(path: str) -> Iterator[Any]:
+    with gzip.open(path, "rb") as segment_file:
+        decoder = cbor2.CBORDecoder(segment_file)
+        while True:
+            try:
+                yield decoder.decode()
+            except cbor2.CBORDecodeEOF:
+                return
+
+
+def read_backup(
+    directory: str = BACKUP_DIR,
+) -> Tuple[Dict[str, str], Iterator[Tuple[int, Dict[str, Any]]]]:
+    """Lit la dernière sauvegarde sans la charger entièrement en mémoire.
+
+    Returns:
+        Tuple[Dict[str, str], Iterator[Tuple[int, Dict[str, Any]]]]: la
+            bibliothèque des assets, et les blocs déstructurés avec leur
+            numéro de séquence, dans l'ordre de la chaîne.
+    """
+    manifest = load_manifest(directory)
+    rollup = last_rollup(manifest)
+    if rollup is None:
+        return {}, iter(())
+
+    segment_paths = [
+        os.path.join(directory, segment["file"])
+        for segment in manifest["segments"][rollup:]
+    ]
+
+    full_records = _segment_records(segment_paths[0])
+    assets = dict(next(full_records)["assets"])
+
+    # Les segments incrémentaux, petits, sont lus en premier pour savoir quels
+    # blocs de la sauvegarde complète ont été retirés ou remplacés depuis. Un
+    # segment l'emporte sur les précédents pour un même numéro de séquence.
+    removed = set()
+    added = {}
+    for segment_path in segment_paths[1:]:
+        records = _segment_records(segment_path)
+        header = next(records)
+        assets.update(header["assets"])
+        for seq in header["removed"]:
+            removed.add(seq)
+            added.pop(seq, None)
+        for seq, block in records:
+            added[seq] = block
+
+    def blocks():
+        # Les blocs de la sauvegarde complète et ceux des incréments sont
+        # fusionnés dans l'ordre de la chaîne
+        full_blocks = (
+            (seq, block)
+            for seq, block in full_records
+            if seq not in removed and seq not in added
+        )
+        yield from heapq.merge(
+            full_blocks, sorted(added.items()), key=lambda item: item[0]
+        )
+
+    return assets, blocks()
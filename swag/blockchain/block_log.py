@@ -0,0 +1,126 @@
+import os
+import struct
+from typing import Any, Dict, Iterable, Iterator, Tuple
+from uuid import uuid4
+
+import cbor2
+
+BLOCK_LOG_PATH = "swagchain.log"
+
+# Chaque enregistrement est précédé de sa taille, sur 4 octets big-endian
+_RECORD_LENGTH = struct.Struct(">I")
+
+
+class BlockLog:
+    """Journal local, en ajout seul, des enregistrements de la $wagChain™.
+
+    Chaque enregistrement est un objet CBOR précédé de sa longueur. Le premier
+    enregistrement du fichier porte l'identifiant du journal, qui permet de
+    vérifier qu'un snapshot a bien été pris sur ce journal-ci.
+    """
+
+    def __init__(self, path: str = BLOCK_LOG_PATH):
+        self.path = path
+        self._file = open(path, "a+b")
+
+        if self._file.seek(0, os.SEEK_END) == 0:
+            self.log_id = uuid4().hex
+            self.append({"log_id": self.log_id})
+
+        self._header_end, header = next(self.records(0))
+        self.log_id = header["log_id"]
+
+    @property
+    def offset(self) -> int:
+        return self._file.seek(0, os.SEEK_END)
+
+    @property
+    def is_empty(self) -> bool:
+        """Vrai si le journal ne contient que son en-tête."""
+        return self.offset == self._header_end
+
+    def append(self, *records: Dict[str, Any], sync: bool = True):
+        """Ajoute des enregistrements à la fin du journal.
+
+        Tous les enregistrements d'un même appel sont écrits d'un seul bloc
+        et ne coûtent qu'un seul fsync.
+        """
+        data = bytearray()
+        for record in records:
+            payload = cbor2.dumps(record)
+            data += _RECORD_LENGTH.pack(len(payload))
+            data += payload
+
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(data)
+        if sync:
+            self.sync()
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def records(self, offset: int) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Itère sur les enregistrements à partir de `offset`.
+
+        Renvoie pour chaque enregistrement la position juste après lui, à
+        stocker dans un snapshot pour reprendre la lecture à cet endroit. Un
+        enregistrement incomplet en fin de fichier (crash pendant l'écriture)
+        est tronqué.
+        """
+        self._file.flush()
+        end = self.offset
+
+        with open(self.path, "rb") as log_file:
+            log_file.seek(offset)
+
+            while offset < end:
+                header = log_file.read(_RECORD_LENGTH.size)
+                if len(header) < _RECORD_LENGTH.size:
+                    break
+                (length,) = _RECORD_LENGTH.unpack(header)
+                payload = log_file.read(length)
+                if len(payload) < length:
+                    break
+
+                offset += _RECORD_LENGTH.size + length
+                yield offset, cbor2.loads(payload)
+
+        if offset < end:
+            print(f"Enregistrement incomplet en fin de journal, troncature à {offset}")
+            self._file.truncate(offset)
+
+    def rewrite(self, records: Iterable[Dict[str, Any]]):
+        """Remplace le contenu du journal par `records`.
+
+        Le nouveau journal est écrit à côté puis renommé, et reçoit un nouvel
+        identifiant : les snapshots pris sur l'ancien ne lui sont plus
+        appliqués.
+        """
+        tmp_path = f"{self.path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        new_log = BlockLog(tmp_path)
+        new_log.append(*records)
+        new_log.close()
+
+        self._file.close()
+        os.replace(tmp_path, self.path)
+
+        self._file = open(self.path, "a+b")
+        self.log_id = new_log.log_id
+        self._header_end = new_log._header_end
+
+    def move_to(self, path: str):
+        """Renomme le journal en `path`, en remplaçant le fichier qui s'y
+        trouve."""
+        self.sync()
+        self._file.close()
+        os.replace(self.path, path)
+
+        self.path = path
+        self._file = open(path, "a+b")
+
+    def close(self):
+        self._file.close()
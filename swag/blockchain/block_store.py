@@ -0,0 +1,90 @@
+from collections.abc import MutableMapping
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from swag.block import Block
+
+from .wire_format import decode_block, encode_block, peek_block_class
+
+# Position d'un bloc dans le tampon : son décalage et sa longueur, réunis dans
+# un seul entier pour ne pas payer un tuple par bloc
+_LENGTH_BITS = 32
+_LENGTH_MASK = (1 << _LENGTH_BITS) - 1
+
+
+class BlockStore(MutableMapping):
+    """Blocs de la $wagChain™, par numéro de séquence.
+
+    Une fois exécutés, les blocs ne sont presque plus jamais relus : ils sont
+    gardés encodés au format binaire des messages, bout à bout dans un seul
+    tampon, et ne sont décodés qu'à la lecture. Chaque lecture renvoie donc
+    un nouvel objet.
+    """
+
+    def __init__(self, blocks: Iterable[Tuple[int, Block]] = ()):
+        self._data = bytearray()
+        # Numéro de séquence -> position du bloc encodé dans le tampon
+        self._positions: Dict[int, int] = {}
+        # Octets du tampon occupés par des blocs retirés ou remplacés
+        self._garbage = 0
+
+        for seq, block in blocks:
+            self.add(seq, block)
+
+    def add(self, seq: int, block: Block, encoded_block: Optional[bytes] = None):
+        """Range un bloc, déjà encodé par `encode_block` si `encoded_block`
+        est donné."""
+        if encoded_block is None:
+            encoded_block = encode_block(block)
+
+        if seq in self._positions:
+            self._garbage += self._positions[seq] & _LENGTH_MASK
+
+        self._positions[seq] = len(self._data) << _LENGTH_BITS | len(encoded_block)
+        self._data += encoded_block
+        self._collect()
+
+    def encoded(self, seq: int) -> bytes:
+        """Bloc encodé, tel que publié dans le canal."""
+        position = self._positions[seq]
+        offset = position >> _LENGTH_BITS
+        return bytes(self._data[offset : offset + (position & _LENGTH_MASK)])
+
+    def block_class(self, seq: int) -> type:
+        """Classe du bloc, lue sans le décoder."""
+        block_class = peek_block_class(self._data, self._positions[seq] >> _LENGTH_BITS)
+        return block_class or type(self[seq])
+
+    def __getitem__(self, seq: int) -> Block:
+        return decode_block(self.encoded(seq))
+
+    def __setitem__(self, seq: int, block: Block):
+        self.add(seq, block)
+
+    def __delitem__(self, seq: int):
+        self._garbage += self._positions.pop(seq) & _LENGTH_MASK
+        self._collect()
+
+    def __contains__(self, seq) -> bool:
+        return seq in self._positions
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def _collect(self):
+        # Le tampon est recopié sans les blocs retirés dès qu'ils en occupent
+        # plus de la moitié
+        if self._garbage <= len(self._data) // 2:
+            return
+
+        data = bytearray()
+        for seq, position in self._positions.items():
+            offset = position >> _LENGTH_BITS
+            length = position & _LENGTH_MASK
+            self._positions[seq] = len(data) << _LENGTH_BITS | length
+            data += self._data[offset : offset + length]
+
+        self._data = data
+        self._garbage = 0
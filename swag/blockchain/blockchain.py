@@ -1,21 +1,25 @@
+from copy import deepcopy
 from datetime import datetime
 from decimal import ROUND_05UP, ROUND_DOWN, ROUND_UP, Decimal
 import os
 import random
 import shutil
-from typing import Dict, List
+from typing import Dict, List, Optional
 from arrow import utcnow
 from attr import attrs, attrib
+import numpy as np
 from numpy import array, sqrt
 from numpy.random import triangular
-import cbor2
-import json
-from arrow import Arrow
 
 from swag.artefacts.accounts import Accounts
 from swag.artefacts.assets import AssetDict
 from swag.artefacts.guild import GuildDict
-from swag.blockchain.blockchain_parser import unstructure_block
+from swag.artefacts.view import ArtefactView
+from swag.blockchain.backup import BACKUP_DIR, load_manifest, read_backup, write_segment
+from swag.blockchain.blockchain_parser import structure_block
+from swag.blockchain.block_store import BlockStore
+from swag.blockchain.profiler import EXECUTE, INDEX, VALIDATE, BlockProfiler
+from swag.blockchain.wire_format import decode_block
 from swag.blocks.swag_blocks import Transaction
 from swag.blocks.system_blocks import AssetUploadBlock
 from swag.blocks.yfu_blocks import YfuGenerationBlock
@@ -27,10 +31,18 @@ from swag.yfu import Yfu, YfuDict
 from utils import randomly_distribute
 
 from ..artefacts import Guild
-from ..stylog import unit_style_generation
+from ..stylog import (
+    growth_rate,
+    growth_rates,
+    unit_style_generation,
+    unit_style_generations,
+)
 from ..blocks import (
+    AccountCreation,
+    AccountDeletion,
     ReturnOnInvestment,
     StyleGeneration,
+    YfuPowerActivation,
 )
 from ..block import Block
 from ..cauchy import choice
@@ -41,74 +53,204 @@ from ..errors import StyleStillBlocked
 from swag.stylog import stylog
 
 
-def make_info(obj):
-    cls = type(obj)
-
-    class Info(cls):
-        def __init__(self, orig):
-            self.__dict__ = orig.__dict__
-
-            def setattr(self, __name: str, __value) -> None:
-                raise AttributeError
-
-            def delattr(self, __name: str) -> None:
-                raise AttributeError
-
-            self.__setattr__ = setattr
-            self.__delattr__ = delattr
-
-    return Info(obj)
-
-
-def json_converter(o):
-    if isinstance(o, Arrow):
-        return o.__str__()
+def index_blocks(blocks):
+    return BlockStore(enumerate(blocks))
 
 
 @attrs
 class SwagChain:
-    _chain: List[Block] = attrib()
+    # Numéro de séquence -> bloc, dans l'ordre de la chaîne
+    _chain: BlockStore = attrib(converter=index_blocks)
+    _next_seq: int = attrib(init=False, default=0)
     _accounts: Accounts = attrib(init=False, factory=Accounts)
     _guilds: Dict[int, Guild] = attrib(init=False, factory=GuildDict)
     _yfus: Dict[YfuId, Yfu] = attrib(init=False, factory=YfuDict)
     _assets: Dict[str, str] = attrib(init=False, factory=AssetDict)
+    # Vues en lecture seule des artefacts, par identifiant
+    _views: Dict[object, ArtefactView] = attrib(init=False, factory=dict)
+    # Profilage de l'ajout des blocs, désactivé par défaut
+    _profiler: Optional[BlockProfiler] = attrib(init=False, default=None)
 
     def __attrs_post_init__(self):
-        for block in self._chain:
+        for block in self._chain.values():
+            self._run(block)
+        self._next_seq = max(self._chain, default=-1) + 1
+
+    def append(self, block, encoded_block=None):
+        """Ajoute un bloc à la chaîne et renvoie son numéro de séquence.
+
+        `encoded_block` évite de réencoder un bloc relu au format binaire.
+        """
+        self._run(block)
+        if self._profiler is None:
+            return self._index(block, encoded_block)
+
+        with self._profiler.measure(type(block), INDEX):
+            return self._index(block, encoded_block)
+
+    def _run(self, block):
+        # Le profilage, s'il est activé, mesure séparément les deux phases
+        if self._profiler is None:
             block.validate(self)
             block.execute(self)
+        else:
+            with self._profiler.measure(type(block), VALIDATE):
+                block.validate(self)
+            with self._profiler.measure(type(block), EXECUTE):
+                block.execute(self)
 
-    def append(self, block):
-        block.validate(self)
-        block.execute(self)
-        self._chain.append(block)
+        if block.changes_bonuses:
+            self._accounts.invalidate_bonuses()
+
+    def _index(self, block, encoded_block=None):
+        # Le bloc n'est encodé qu'après son exécution, qui peut le compléter
+        seq = self._next_seq
+        self._next_seq += 1
+        self._chain.add(seq, block, encoded_block)
+        return seq
 
     def extend(self, blocks):
         for block in blocks:
             self.append(block)
 
-    def remove(self, block):
-        self._chain.remove(block)
-
-    def save_backup(self):
-        saved_blocks = []
+    def append_many(self, blocks, encoded_blocks=None):
+        """Ajoute un groupe de blocs d'un seul tenant.
 
-        for block in self._chain:
-            saved_blocks.append(
-                json.dumps(unstructure_block(block), default=json_converter)
+        Si l'un des blocs est refusé, l'état de la chaîne est restauré tel
+        qu'il était avant le groupe et aucun bloc n'est ajouté. Renvoie les
+        numéros de séquence des blocs, qui se suivent.
+        """
+        # Même seul, un bloc peut être refusé après avoir modifié l'état, comme
+        # une transaction qui a débité le donneur avant d'échouer sur le
+        # bénéficiaire
+        rollback = self._checkpoint(blocks)
+        try:
+            for block in blocks:
+                self._run(block)
+        except Exception:
+            rollback()
+            raise
+
+        return [
+            self._index(block, encoded_block)
+            for block, encoded_block in zip(
+                blocks, encoded_blocks or [None] * len(blocks)
             )
+        ]
+
+    def remove(self, seq):
+        """Retire de la chaîne le bloc de ce numéro de séquence."""
+        del self._chain[seq]
+        return seq
+
+    def remove_many(self, seqs):
+        return [SwagChain.remove(self, seq) for seq in seqs]
+
+    def _replace(self, seq, block):
+        self._chain[seq] = block
+
+    def state(self):
+        """État complet de la chaîne, tel qu'enregistré dans un snapshot."""
+        return {
+            "chain": self._chain,
+            "next_seq": self._next_seq,
+            **self._artefacts(),
+        }
+
+    def load_state(self, state):
+        self._chain = state["chain"]
+        self._next_seq = state["next_seq"]
+        self._load_artefacts(state)
+
+    def _checkpoint(self, blocks):
+        # Si chaque bloc du groupe connaît les comptes qu'il modifie, comme les
+        # transactions, seuls ces comptes sont copiés. Sinon, tout l'état l'est.
+        account_ids = set()
+        for block in blocks:
+            touched_accounts = block.touched_accounts()
+            if touched_accounts is None:
+                state = deepcopy(self._artefacts())
+                return lambda: self._load_artefacts(state)
+            account_ids.update(touched_accounts)
+
+        checkpoint = self._accounts.checkpoint(account_ids)
+        return lambda: self._accounts.rollback(checkpoint)
+
+    def _artefacts(self):
+        return {
+            "accounts": self._accounts,
+            "guilds": self._guilds,
+            "yfus": self._yfus,
+            "assets": self._assets,
+        }
+
+    def _load_artefacts(self, state):
+        self._views.clear()
+        self._accounts = state["accounts"]
+        self._guilds = state["guilds"]
+        self._yfus = state["yfus"]
+        self._assets = state["assets"]
+
+    def save_backup(self, directory: str = BACKUP_DIR):
+        """Sauvegarde complète de la chaîne, écrite bloc par bloc."""
+        write_segment(
+            load_manifest(directory),
+            "full",
+            self._encoded_blocks(),
+            [],
+            dict(self._assets),
+            None,
+            0,
+            directory,
+        )
 
-        with open("swagchain.bk", "wb") as backup_file:
-            cbor2.dump(saved_blocks, backup_file)
+    def _encoded_blocks(self):
+        for seq in self._chain:
+            yield seq, self._chain.encoded(seq)
+
+    @staticmethod
+    def from_backup(directory: str = BACKUP_DIR):
+        """Reconstruit la chaîne à partir des sauvegardes locales, sans
+        passer par Discord."""
+        chain = SwagChain([])
+        assets, saved_blocks = read_backup(directory)
+        # Les blocs des Yfus ont besoin des urls de leurs avatars
+        chain._assets.update(assets)
+
+        for seq, saved_block in saved_blocks:
+            chain._next_seq = seq
+            try:
+                # Les sauvegardes antérieures au format binaire contiennent
+                # les blocs déstructurés
+                if isinstance(saved_block, bytes):
+                    SwagChain.append(chain, decode_block(saved_block), saved_block)
+                else:
+                    SwagChain.append(chain, structure_block(saved_block))
+            except Exception as e:
+                print(f"\n\n\033[91mERREUR SUR LA BLOCKCHAIN\033[0m : {e}\n\n")
+                chain._next_seq = seq + 1
+
+        return chain
+
+    def _view(self, key, artefact):
+        # Une vue est créée une seule fois par artefact, puis réutilisée tant
+        # que l'identifiant désigne le même objet
+        view = self._views.get(key)
+        if view is None or view._artefact is not artefact:
+            view = self._views[key] = ArtefactView(artefact)
+        return view
 
     def account(self, user_id):
-        return make_info(self._accounts[UserId(user_id)])
+        user_id = UserId(user_id)
+        return self._view(user_id, self._accounts[user_id])
 
     def cagnotte(self, cagnotte_id):
-        return make_info(self._accounts[CagnotteId(cagnotte_id)])
+        cagnotte_id = CagnotteId(cagnotte_id)
+        return self._view(cagnotte_id, self._accounts[cagnotte_id])
 
     def yfu(self, yfu_id):
-        return make_info(self._yfus[YfuId(yfu_id)])
+        yfu_id = YfuId(yfu_id)
+        return self._view(yfu_id, self._yfus[yfu_id])
 
     def _guild(self, guild_id):
         try:
@@ -119,18 +261,39 @@ class SwagChain:
 
     async def generate_style(self):
         await self.append(
-            StyleGeneration(
-                issuer_id=self._id,
-                amounts={
-                    user_id: unit_style_generation(
-                        user_account.blocked_swag, user_account.style_rate
-                    )
-                    for (user_id, user_account) in self._accounts.users.items()
-                    if Swag(0) < user_account.blocked_swag
-                },
-            )
+            StyleGeneration(issuer_id=self._id, amounts=self._style_amounts())
         )
 
+    def _style_amounts(self):
+        columns = self._accounts.columns
+        if columns is None:
+            return {
+                user_id: unit_style_generation(
+                    user_account.blocked_swag, user_account.style_rate
+                )
+                for (user_id, user_account) in self._accounts.users.items()
+                if Swag(0) < user_account.blocked_swag
+            }
+
+        # Avec les colonnes, le $tyle de tous les utilisateurs est calculé d'un
+        # seul coup, et seuls les résultats incertains le sont un par un
+        rows = np.flatnonzero(columns.blocked_swag > 0)
+        units, unsure = unit_style_generations(
+            columns.blocked_swag[rows], columns.style_rate[rows]
+        )
+
+        amounts = {}
+        for row, unit, is_unsure in zip(rows.tolist(), units.tolist(), unsure.tolist()):
+            user_id = columns.user_ids[row]
+            if is_unsure:
+                user_account = self._accounts.users[user_id]
+                amounts[user_id] = unit_style_generation(
+                    user_account.blocked_swag, user_account.style_rate
+                )
+            else:
+                amounts[user_id] = Style.from_units(unit)
+        return amounts
+
     async def unblock_swag(self):
         for user_id, user_account in self._accounts.users.items():
             try:
@@ -148,52 +311,28 @@ class SwagChain:
                 pass
 
     def update_growth_rates(self):
-        forbes = sorted(
-            self._accounts.users.values(),
-            key=lambda item: item.swag_balance,
-            reverse=True,
-        )
-
-        # Fonction mathématique, qui permet au premier d'avoir toujours
-        # 50%, et à celui à la moitié du classement 10%
-        N = len(self._accounts.users)
-
-        def rate(rank):
-            return Decimal(100 + 10 / 3 * (pow(16, 1 - rank / N) - 1)).quantize(
-                Decimal(".01"), rounding=ROUND_UP
-            )
-
-        for rank, user_account in enumerate(forbes):
-            user_account.style_rate = (
-                rate(rank) + user_account.bonuses(self).blocking_bonus
-            )
-
-    async def clean_old_style_gen_block(self):
-        ##Get the oldest blocking date of all accounts :
-        try:
-            oldest_blocking_date = min(
-                [
-                    user_account.blocking_date
-                    for user_account in self._accounts.users.values()
-                    if user_account.blocking_date != None
-                ]
-            )
-        except ValueError as e:
-            # If no blocking date is found, then we can clean all the StyleGeneration
-            oldest_blocking_date = utcnow()
-
-        print(f"Nettoyage de la blockchain avant la date du {oldest_blocking_date}\n")
-        ##Get all the StyleGenerationBlock which was added before this date
-        old_style_gen_block = [
-            block
-            for block in self._chain
-            if isinstance(block, StyleGeneration)
-            and block.timestamp.datetime < oldest_blocking_date
-        ]
-
-        ##Remove all those useless block from the chain
-        for block in old_style_gen_block:
-            await self.remove(block)
+        # Les taux ne dépendent que du rang : ils sont calculés d'un seul coup
+        # pour tout le classement
+        n = len(self._accounts.users)
+        rates, unsure = growth_rates(n)
+        # Des rangs voisins ont souvent le même taux : un seul Decimal est
+        # créé par taux, et partagé par les comptes
+        decimals = {}
+
+        for rank, (user_id, rate, is_unsure) in enumerate(
+            zip(self._accounts.forbes, rates.tolist(), unsure.tolist())
+        ):
+            user_account = self._accounts.users[user_id]
+            if is_unsure:
+                style_rate = growth_rate(rank, n)
+            elif (style_rate := decimals.get(rate)) is None:
+                style_rate = decimals[rate] = Decimal(rate).scaleb(-2)
+            # Seuls les ¥fus et les services peuvent donner un bonus de blocage
+            if user_account.has_bonus_sources:
+                style_rate += user_account.bonuses(self).blocking_bonus
+            # D'une heure à l'autre, la plupart des rangs ne changent pas
+            if user_account.style_rate != style_rate:
+                user_account.style_rate = style_rate
 
     async def clean_old_style_gen_block(self):
         # Get the oldest blocking date of all accounts :
@@ -210,39 +349,125 @@ class SwagChain:
         print(f"Nettoyage de la blockchain avant la date du {oldest_blocking_date}\n")
 
         # Remove all the StyleGenerationBlock which was added before the oldest date
-        for block in self._chain:
-            if (
-                isinstance(block, StyleGeneration)
-                and block.timestamp.datetime < oldest_blocking_date
+        await self.remove_many(
+            [
+                seq
+                for seq in self._chain
+                if self._chain.block_class(seq) is StyleGeneration
+                and self._chain[seq].timestamp.datetime < oldest_blocking_date
+            ]
+        )
+
+    def compact_style_gen_blocks(self):
+        """Regroupe les StyleGeneration successifs de chaque utilisateur.
+
+        Tant qu'aucun bloc ne lit ou ne remet à zéro le $tyle en attente d'un
+        utilisateur, le $tyle qui lui est généré peut être versé en une seule
+        fois, par le dernier StyleGeneration de la période, sans que le rejeu
+        de la chaîne n'aboutisse à un autre état. Seules les périodes closes
+        sont regroupées.
+
+        Returns:
+            Tuple[List[int], List[int]]: numéros de séquence des blocs
+                remplacés par leur agrégat, et des blocs retirés.
+        """
+        # Utilisateur -> $tyle généré depuis le dernier bloc qui a touché à
+        # son $tyle en attente, et dernier StyleGeneration qui l'a crédité
+        pending = {}
+        last_generation = {}
+        # Numéro de séquence -> montants du StyleGeneration compacté
+        compacted_amounts = {}
+
+        # Utilisateur -> StyleGeneration de sa période en cours, et montants
+        period_generations = {}
+
+        def close_period(user_id):
+            if user_id in pending:
+                compacted_amounts.setdefault(last_generation.pop(user_id), {})[
+                    user_id
+                ] = pending.pop(user_id)
+                del period_generations[user_id]
+
+        generations = []
+        for seq in self._chain:
+            # Seuls ces blocs sont décodés
+            if not issubclass(
+                self._chain.block_class(seq),
+                (
+                    StyleGeneration,
+                    YfuPowerActivation,
+                    ReturnOnInvestment,
+                    AccountCreation,
+                    AccountDeletion,
+                ),
             ):
-                await self.remove(block)
+                continue
+
+            block = self._chain[seq]
+            if isinstance(block, StyleGeneration):
+                generations.append(seq)
+                for user_id, amount in block.amounts.items():
+                    pending[user_id] = pending.get(user_id, Style(0)) + amount
+                    last_generation[user_id] = seq
+                    period_generations.setdefault(user_id, []).append((seq, amount))
+            elif isinstance(block, YfuPowerActivation):
+                # Un pouvoir peut toucher au $tyle en attente de n'importe qui
+                for user_id in list(pending):
+                    close_period(user_id)
+            elif isinstance(
+                block, (ReturnOnInvestment, AccountCreation, AccountDeletion)
+            ):
+                close_period(block.user_id)
+
+        # Les périodes encore ouvertes, comme un blocage en cours, ne sont pas
+        # regroupées : leurs StyleGeneration restent tels quels
+        for user_id, generations_amounts in period_generations.items():
+            for seq, amount in generations_amounts:
+                compacted_amounts.setdefault(seq, {})[user_id] = amount
+
+        replaced_seqs, removed_seqs = [], []
+        for seq in generations:
+            amounts = compacted_amounts.get(seq)
+
+            if not amounts:
+                removed_seqs.append(seq)
+                continue
+
+            block = self._chain[seq]
+            if amounts != block.amounts:
+                self._replace(
+                    seq,
+                    StyleGeneration(
+                        timestamp=block.timestamp,
+                        issuer_id=block.issuer_id,
+                        amounts=amounts,
+                    ),
+                )
+                replaced_seqs.append(seq)
+
+        return replaced_seqs, SwagChain.remove_many(self, removed_seqs)
 
     @property
     def forbes(self):
-        return sorted(
-            (
-                (user_id, make_info(user_account))
-                for user_id, user_account in self._accounts.users.items()
-            ),
-            key=lambda item: item[1].swag_balance,
-            reverse=True,
-        )
+        return [
+            (user_id, self._view(user_id, self._accounts.users[user_id]))
+            for user_id in self._accounts.forbes
+        ]
 
     @property
     def cagnottes(self):
         return (
-            (cagnotte_id, make_info(cagnotte))
+            (cagnotte_id, self._view(cagnotte_id, cagnotte))
             for cagnotte_id, cagnotte in self._accounts.cagnottes.items()
         )
 
     @property
     def yfus(self):
-        return ((yfu_id, make_info(yfu)) for yfu_id, yfu in self._yfus.items())
+        return ((yfu_id, self._view(yfu_id, yfu)) for yfu_id, yfu in self._yfus.items())
 
     @property
     def swaggest(self):
-        for key, _ in self.forbes:
-            return key
+        return self._accounts.forbes.first
 
     @property
     def next_yfu_id(self):
@@ -268,24 +493,17 @@ class SwagChain:
         weights /= sum(weights)
         winner = choice(tuple(participants), p=weights)
 
-        if swag_reward != Swag(0):
-            await self.append(
-                Transaction(
-                    issuer_id=issuer_id,
-                    giver_id=cagnotte_id,
-                    recipient_id=winner,
-                    amount=swag_reward,
-                )
-            )
-        if style_reward != Style(0):
-            await self.append(
-                Transaction(
-                    issuer_id=issuer_id,
-                    giver_id=cagnotte_id,
-                    recipient_id=winner,
-                    amount=style_reward,
-                )
+        transactions = [
+            Transaction(
+                issuer_id=issuer_id,
+                giver_id=cagnotte_id,
+                recipient_id=winner,
+                amount=reward,
             )
+            for reward in (swag_reward, style_reward)
+            if reward.value != 0
+        ]
+        await self.append_many(transactions)
 
         return winner, swag_reward, style_reward
 
@@ -300,26 +518,21 @@ class SwagChain:
         swag_gain = Swag(cagnotte.swag_balance.value / len(account_list))
         style_gain = Style(cagnotte.style_balance.value / len(account_list))
 
-        for account_id in account_list:
-            if swag_gain != Swag(0):
-                await self.append(
-                    Transaction(
-                        issuer_id=issuer_id,
-                        giver_id=cagnotte_id,
-                        recipient_id=account_id,
-                        amount=swag_gain,
-                    )
-                )
-
-            if style_gain != Style(0):
-                await self.append(
-                    Transaction(
-                        issuer_id=issuer_id,
-                        giver_id=cagnotte_id,
-                        recipient_id=account_id,
-                        amount=style_gain,
-                    )
+        # Toutes les parts sont versées d'un seul tenant : si l'une échoue,
+        # personne n'est payé
+        await self.append_many(
+            [
+                Transaction(
+                    issuer_id=issuer_id,
+                    giver_id=cagnotte_id,
+                    recipient_id=account_id,
+                    amount=gain,
                 )
+                for account_id in account_list
+                for gain in (swag_gain, style_gain)
+                if gain.value != 0
+            ]
+        )
 
         if cagnotte.is_empty:
             winner_rest, swag_rest, style_rest = None, None, None
@@ -1,5 +1,9 @@
+from datetime import datetime
 from decimal import Decimal
 from typing import Any, Dict, List, Type, Union
+import arrow
+from arrow import Arrow
+from dateutil.tz import tzoffset
 from swag import powers
 
 from swag.artefacts.accounts import CagnotteRank
@@ -56,6 +60,10 @@ def unstructure_power(obj: Power) -> str:
 converter.register_structure_hook(Decimal, structure_decimal)
 converter.register_unstructure_hook(Decimal, unstructure_decimal)
 
+# Les dates sont sérialisées comme dans les messages JSON du canal, ce qui
+# permet aussi d'écrire les blocs déstructurés directement en CBOR
+converter.register_unstructure_hook(Arrow, str)
+
 converter.register_structure_hook(Power, structure_power)
 converter.register_unstructure_hook(Power, unstructure_power)
 
@@ -144,8 +152,29 @@ block_types = {
 }
 
 
+def structure_timestamp(value: str, cls: Type) -> Arrow:
+    # arrow.get analyse le format de la date à chaque appel, alors que les
+    # dates des blocs sont écrites au format ISO par str(Arrow), que datetime
+    # lit directement
+    try:
+        timestamp = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return arrow.get(value)
+
+    if timestamp.tzinfo is None:
+        return arrow.get(value)
+
+    return Arrow.fromdatetime(
+        timestamp, tzoffset(None, int(timestamp.utcoffset().total_seconds()))
+    )
+
+
+converter.register_structure_hook(Arrow, structure_timestamp)
+
+
 def structure_block(unstructured_block: Dict):
-    print(unstructured_block)
+    """Bloc publié au format JSON, avant le format binaire."""
+    unstructured_block = dict(unstructured_block)
     block_type = block_types[unstructured_block.pop("block_type")]
     return converter.structure(unstructured_block, block_type)
 
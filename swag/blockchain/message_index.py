@@ -0,0 +1,67 @@
+from typing import Dict, Iterable, Iterator, KeysView, List, Optional, Set, Tuple
+
+
+class MessageIndex:
+    """Index des messages du canal qui publient les blocs de la $wagChain™.
+
+    Les blocs y sont identifiés par leur numéro de séquence, qui ne change
+    pas d'un démarrage à l'autre. L'index est tenu à jour à chaque
+    publication, consigné dans le journal local et enregistré dans les
+    snapshots : retirer ou réécrire un bloc ne demande jamais de parcourir
+    l'historique du canal.
+    """
+
+    def __init__(self):
+        # Numéro de séquence -> id du message qui publie le bloc
+        self._messages: Dict[int, int] = {}
+        # Id de message -> numéros de séquence des blocs qu'il publie
+        self._seqs: Dict[int, List[int]] = {}
+        # Messages dont un bloc a été remplacé, à réécrire
+        self._dirty: Set[int] = set()
+
+    def __contains__(self, seq: int) -> bool:
+        return seq in self._messages
+
+    def __getitem__(self, seq: int) -> int:
+        return self._messages[seq]
+
+    def get(self, seq: int) -> Optional[int]:
+        return self._messages.get(seq)
+
+    def seqs(self) -> KeysView[int]:
+        """Numéros de séquence des blocs publiés."""
+        return self._messages.keys()
+
+    def published_in(self, message_id: int) -> List[int]:
+        """Numéros de séquence des blocs publiés par un message."""
+        return self._seqs.get(message_id, [])
+
+    def messages(self) -> Iterator[Tuple[int, List[int]]]:
+        return iter(self._seqs.items())
+
+    def publish(self, seqs: Iterable[int], message_id: int):
+        seqs = list(seqs)
+        for seq in seqs:
+            self._messages[seq] = message_id
+        self._seqs.setdefault(message_id, []).extend(seqs)
+
+    def unpublish(self, seqs: Iterable[int]):
+        for seq in seqs:
+            message_id = self._messages.pop(seq, None)
+            if message_id not in self._seqs:
+                continue
+
+            self._seqs[message_id].remove(seq)
+            if not self._seqs[message_id]:
+                del self._seqs[message_id]
+                self._dirty.discard(message_id)
+
+    @property
+    def dirty(self) -> Set[int]:
+        return self._dirty
+
+    def mark_dirty(self, message_ids: Iterable[int]):
+        self._dirty.update(message_ids)
+
+    def mark_clean(self, message_id: int):
+        self._dirty.discard(message_id)
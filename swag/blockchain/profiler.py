@@ -0,0 +1,135 @@
+import json
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+from arrow import utcnow
+
+PROFILE_PATH = "block_profile.json"
+
+# Phases de l'ajout d'un bloc : sa validation, son exécution, son rangement
+# encodé dans la chaîne, puis, sur le bot, son écriture dans le journal local
+VALIDATE = "validate"
+EXECUTE = "execute"
+INDEX = "index"
+PERSIST = "persist"
+
+# Durées gardées, par classe de bloc et par phase, pour estimer les percentiles
+SAMPLE_SIZE = 1024
+
+
+class PhaseStats:
+    __slots__ = ("count", "total", "max", "allocated", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.allocated = 0
+        self.samples = []
+
+    def add(self, duration: float, allocated: int, rng: random.Random):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.allocated += allocated
+
+        # Échantillonnage par réservoir : chaque durée a la même chance d'être
+        # gardée, quel que soit le nombre de blocs
+        if len(self.samples) < SAMPLE_SIZE:
+            self.samples.append(duration)
+        elif (i := rng.randrange(self.count)) < SAMPLE_SIZE:
+            self.samples[i] = duration
+
+    def summary(self, allocations: bool):
+        samples = sorted(self.samples)
+
+        def percentile(p):
+            return samples[min(len(samples) - 1, int(len(samples) * p))] * 1e6
+
+        summary = {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "mean_us": self.total / self.count * 1e6,
+            "p50_us": percentile(0.5),
+            "p99_us": percentile(0.99),
+            "max_us": self.max * 1e6,
+        }
+        if allocations:
+            summary["allocated_bytes"] = self.allocated
+        return summary
+
+
+class BlockProfiler:
+    """Temps passé dans chaque phase de l'ajout des blocs, par classe de bloc.
+
+    Avec `allocations`, tracemalloc est lancé et la mémoire allouée par chaque
+    phase, et toujours occupée à sa fin, est aussi comptée. Cela ralentit
+    nettement tout le bot.
+    """
+
+    def __init__(self, allocations: bool = False):
+        self.allocations = allocations
+        self._owns_tracemalloc = allocations and not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start()
+        self.reset()
+
+    def reset(self):
+        self.since = utcnow()
+        # (classe de bloc, phase) -> statistiques
+        self._stats: Dict[Tuple[str, str], PhaseStats] = {}
+        self._rng = random.Random(0)
+
+    def stop(self):
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+        self.allocations = False
+
+    @contextmanager
+    def measure(self, block_class: type, phase: str):
+        allocated = tracemalloc.get_traced_memory()[0] if self.allocations else 0
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            if self.allocations:
+                allocated = tracemalloc.get_traced_memory()[0] - allocated
+
+            key = (block_class.__name__, phase)
+            if key not in self._stats:
+                self._stats[key] = PhaseStats()
+            self._stats[key].add(duration, allocated, self._rng)
+
+    def report(self):
+        """Statistiques par classe de bloc puis par phase, sérialisables en
+        JSON."""
+        blocks = {}
+        for (block_class, phase), stats in sorted(self._stats.items()):
+            blocks.setdefault(block_class, {})[phase] = stats.summary(self.allocations)
+        return {
+            "since": self.since.isoformat(),
+            "until": utcnow().isoformat(),
+            "allocations": self.allocations,
+            "blocks": blocks,
+        }
+
+    def hottest(self, limit: int = 10):
+        """Phases les plus coûteuses au total, de la plus coûteuse à la moins
+        coûteuse."""
+        return sorted(
+            (
+                (block_class, phase, stats.summary(self.allocations))
+                for (block_class, phase), stats in self._stats.items()
+            ),
+            key=lambda item: item[2]["total_ms"],
+            reverse=True,
+        )[:limit]
+
+    def dump(self, path: str = PROFILE_PATH):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
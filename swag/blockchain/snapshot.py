@@ -0,0 +1,54 @@
+import gc
+import os
+import pickle
+from typing import Any, Dict, Optional
+
+# Incrémenter cette version dès que la forme de l'état sauvegardé change :
+# un snapshot d'une version différente est ignoré et la chaîne est rejouée
+# entièrement.
+SNAPSHOT_VERSION = 12
+
+SNAPSHOT_PATH = "swagchain.snapshot"
+
+
+def save_snapshot(state: Dict[str, Any], path: str = SNAPSHOT_PATH):
+    """Écrit l'état de la $wagChain™ sur le disque.
+
+    Le fichier est d'abord écrit à côté puis renommé, pour qu'un crash en
+    pleine écriture ne laisse jamais un snapshot à moitié écrit.
+    """
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "wb") as snapshot_file:
+        pickle.dump(
+            {"version": SNAPSHOT_VERSION, **state},
+            snapshot_file,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str = SNAPSHOT_PATH) -> Optional[Dict[str, Any]]:
+    """Charge le dernier snapshot, ou None s'il est absent ou inutilisable."""
+    # Le ramasse-miettes se relancerait sans cesse pendant la création des
+    # centaines de milliers d'objets de l'état, qui ne forment aucun cycle à
+    # libérer
+    gc.disable()
+    try:
+        with open(path, "rb") as snapshot_file:
+            state = pickle.load(snapshot_file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"\n\n\033[91mSNAPSHOT IGNORÉ\033[0m : {e}\n\n")
+        return None
+    finally:
+        gc.enable()
+
+    if state.get("version") != SNAPSHOT_VERSION:
+        return None
+
+    return state
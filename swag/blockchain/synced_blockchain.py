@@ -1,88 +1,810 @@
+import asyncio
+from datetime import timedelta
+import io
 import json
-from typing import Dict
-import cbor2
+import os
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 from attr import attrs, attrib
-from arrow import Arrow
 from disnake import TextChannel
 import disnake
+from aiohttp import ClientError
 from swag.block import Block
 from swag.blocks.system_blocks import AssetUploadBlock
 
-from disnake import TextChannel
-import disnake
-from swag.block import Block
 
+from .blockchain_parser import structure_block
+from .blockchain import SwagChain
+from .backup import (
+    BACKUP_DIR,
+    INCREMENTALS_PER_ROLLUP,
+    last_rollup,
+    load_manifest,
+    relink_manifest,
+    write_segment,
+)
+from .block_log import BLOCK_LOG_PATH, BlockLog
+from .message_index import MessageIndex
+from .profiler import PERSIST, BlockProfiler
+from .wire_format import (
+    WIRE_PREFIX,
+    decode_block,
+    encode_block,
+    from_text,
+    pack_payload,
+    text_length,
+    to_text,
+    unpack_payload,
+)
+from .snapshot import SNAPSHOT_PATH, load_snapshot, save_snapshot
+
+# Un message Discord ne peut pas dépasser 2000 caractères : au-delà, les blocs
+# sont publiés dans un fichier joint au message.
+MESSAGE_MAX_LENGTH = 2000
+ATTACHMENT_MAX_SIZE = 1_000_000
+BLOCKS_ATTACHMENT_NAME = "blocks.cbor"
+# Fichier joint des messages publiés avant le format binaire
+LEGACY_BLOCKS_ATTACHMENT_NAME = "blocks.json"
+# Limites de la suppression en masse des messages, avec une marge sur l'âge
+# pour ne pas se faire refuser un message qui vieillit pendant la requête
+BULK_DELETE_MAX_SIZE = 100
+BULK_DELETE_MAX_AGE = timedelta(days=14, minutes=-5)
+# Messages récupérés d'avance lors de l'import de l'historique du canal
+IMPORT_PREFETCH = 64
+
+
+def pack_blocks(blocks):
+    """Regroupe des blocs en lots publiables chacun dans un seul message.
+
+    Args:
+        blocks (List[Tuple[int, Union[Block, bytes]]]): blocs à publier,
+            éventuellement déjà encodés, avec leur numéro de séquence.
+
+    Yields:
+        Dict[int, bytes]: numéro de séquence -> bloc encodé en CBOR, dans
+            l'ordre de la chaîne.
+    """
+    batch = {}
+    size = 0
+
+    for seq, block in blocks:
+        encoded_block = block if isinstance(block, bytes) else encode_block(block)
+        if batch and size + len(encoded_block) > ATTACHMENT_MAX_SIZE:
+            yield batch
+            batch = {}
+            size = 0
+        size += len(encoded_block)
+        batch[seq] = encoded_block
+
+    if batch:
+        yield batch
+
+
+def message_payload(encoded_blocks: Iterable):
+    """Arguments de `send`/`edit` pour publier des blocs dans un message.
+
+    Les blocs sont publiés au format binaire, encodé en base85 dans le
+    contenu du message s'il tient dedans, dans un fichier joint sinon.
+    """
+    payload = pack_payload(
+        block if isinstance(block, bytes) else encode_block(block)
+        for block in encoded_blocks
+    )
+
+    # Le base85 peut former une mention : aucune ne doit notifier personne
+    allowed_mentions = disnake.AllowedMentions.none()
+
+    if text_length(len(payload)) <= MESSAGE_MAX_LENGTH:
+        return {"content": to_text(payload), "allowed_mentions": allowed_mentions}
+
+    return {
+        "content": "",
+        "file": disnake.File(io.BytesIO(payload), filename=BLOCKS_ATTACHMENT_NAME),
+        "allowed_mentions": allowed_mentions,
+    }
+
+
+async def fetch_payload(message) -> Union[str, bytes]:
+    """Blocs publiés dans un message du canal de la $wagChain™, encore
+    encodés : le contenu du message, ou son fichier joint."""
+    if message.content:
+        return message.content
 
-from .blockchain_parser import structure_block, unstructure_block
-from .blockchain import SwagChain, json_converter
+    for attachment in message.attachments:
+        if attachment.filename == BLOCKS_ATTACHMENT_NAME:
+            return await attachment.read()
+        if attachment.filename == LEGACY_BLOCKS_ATTACHMENT_NAME:
+            return (await attachment.read()).decode()
+
+    return message.content
+
+
+def decode_payload(payload: Union[str, bytes]) -> List[Block]:
+    """Blocs publiés dans un message, d'après le résultat de `fetch_payload`.
+
+    Les messages publiés avant le format binaire contiennent une liste JSON,
+    et les plus anciens un seul bloc, sans liste.
+    """
+    if isinstance(payload, bytes):
+        return unpack_payload(payload)
+    if payload.startswith(WIRE_PREFIX):
+        return unpack_payload(from_text(payload))
+
+    unstructured_blocks = json.loads(payload)
+    if isinstance(unstructured_blocks, dict):
+        unstructured_blocks = [unstructured_blocks]
+    return [structure_block(block) for block in unstructured_blocks]
+
+
+async def read_message(message) -> List[Block]:
+    """Blocs publiés dans un message du canal de la $wagChain™."""
+    return decode_payload(await fetch_payload(message))
+
+
+def read_log_block(logged_block):
+    """Bloc d'un enregistrement du journal local, et sa forme encodée."""
+    # Les journaux antérieurs au format binaire contiennent les blocs
+    # déstructurés
+    if isinstance(logged_block, bytes):
+        return decode_block(logged_block), logged_block
+    return structure_block(logged_block), None
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Vrai si la requête peut réussir en étant réessayée : erreur réseau,
+    limite de débit ou erreur du serveur de Discord."""
+    if isinstance(error, disnake.HTTPException):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (ConnectionError, asyncio.TimeoutError, ClientError))
 
 
 @attrs
 class SyncedSwagChain(SwagChain):
+    """$wagChain™ enregistrée dans un journal local et publiée sur Discord.
+
+    Le journal local fait foi : un bloc est validé, exécuté puis écrit dans
+    le journal avant que `append` ne rende la main. La publication dans le
+    canal se fait en tâche de fond, dans l'ordre des blocs, et l'id du
+    message obtenu est à son tour consigné dans le journal.
+    """
+
     _id: int = attrib()
     _channel: TextChannel = attrib(init=False, default=None)
-    _messages: Dict[Arrow, int] = attrib(init=False, default={})
+    _log: BlockLog = attrib(init=False, default=None)
+    _snapshot_path: str = attrib(init=False, default=SNAPSHOT_PATH)
+    _backup_dir: str = attrib(init=False, default=BACKUP_DIR)
+    # Journal et position du dernier snapshot pris ou chargé
+    _snapshot_position: Optional[Tuple[str, int]] = attrib(init=False, default=None)
+    _messages: MessageIndex = attrib(init=False, factory=MessageIndex)
+    _mirror_queue: asyncio.Queue = attrib(init=False, factory=asyncio.Queue)
+    _mirror_task: Optional[asyncio.Task] = attrib(init=False, default=None)
+    _asset_futures: Dict[int, asyncio.Future] = attrib(init=False, factory=dict)
+    # Blocs que la publication a écartés après une erreur définitive
+    _failed_seqs: Dict[int, Exception] = attrib(init=False, factory=dict)
 
     @classmethod
-    async def from_channel(cls, bot_id: int, channel: TextChannel):
+    async def from_channel(
+        cls,
+        bot_id: int,
+        channel: TextChannel,
+        snapshot_path: str = SNAPSHOT_PATH,
+        log_path: str = BLOCK_LOG_PATH,
+        backup_dir: str = BACKUP_DIR,
+        profiler: Optional[BlockProfiler] = None,
+    ):
         synced_chain = cls([], bot_id)
+        synced_chain._profiler = profiler
         synced_chain._channel = channel
-        synced_chain._messages = {}
-        async for message in channel.history(limit=None, oldest_first=True):
-            unstructured_block = json.loads(message.content)
-            block = structure_block(unstructured_block)
+        synced_chain._snapshot_path = snapshot_path
+        synced_chain._backup_dir = backup_dir
+        synced_chain._log = BlockLog(log_path)
+
+        if synced_chain._log.is_empty:
+            # Premier lancement avec le journal local : on le remplit à partir
+            # de l'historique du canal. L'import est écrit dans un journal à
+            # part, qui ne remplace le journal local qu'une fois terminé : un
+            # import interrompu est repris depuis le début au démarrage suivant.
+            synced_chain._log.close()
+            import_path = f"{log_path}.import"
+            if os.path.exists(import_path):
+                os.remove(import_path)
+            synced_chain._log = BlockLog(import_path)
+
+            await synced_chain._import_channel()
+            synced_chain._log.move_to(log_path)
+        else:
+            synced_chain._replay_log()
+
+        # Republication de ce qui n'a pas pu l'être avant le dernier arrêt
+        for seq in sorted(
+            synced_chain._chain.keys() ^ synced_chain._messages.seqs()
+            | {
+                synced_chain._messages.published_in(message_id)[0]
+                for message_id in synced_chain._messages.dirty
+            }
+        ):
+            synced_chain._mirror_queue.put_nowait(seq)
 
+        synced_chain._mirror_task = asyncio.create_task(synced_chain._mirror())
+        return synced_chain
+
+    def _replay_log(self):
+        offset = 0
+
+        # Si un snapshot a été pris sur ce journal, on repart de son état et
+        # on ne rejoue que les enregistrements écrits après lui.
+        snapshot = load_snapshot(self._snapshot_path)
+        if snapshot is not None and snapshot["log_id"] == self._log.log_id:
+            self.load_state(snapshot)
+            offset = snapshot["log_offset"]
+            self._snapshot_position = (snapshot["log_id"], offset)
+            print(f"Snapshot chargé, reprise du journal à l'octet {offset}\n")
+
+        for _, record in self._log.records(offset):
+            if "log_id" in record:
+                continue
+
+            if "block" in record:
+                self._next_seq = record["seq"]
+                try:
+                    SwagChain.append(self, *read_log_block(record["block"]))
+                except Exception as e:
+                    print(f"\n\n\033[91mERREUR SUR LA BLOCKCHAIN\033[0m : {e}\n\n")
+                    self._next_seq = record["seq"] + 1
+
+            elif "blocks" in record:
+                self._next_seq = record["seq"]
+                try:
+                    logged_blocks = [
+                        read_log_block(block) for block in record["blocks"]
+                    ]
+                    SwagChain.append_many(
+                        self,
+                        [block for block, _ in logged_blocks],
+                        [encoded_block for _, encoded_block in logged_blocks],
+                    )
+                except Exception as e:
+                    print(f"\n\n\033[91mERREUR SUR LA BLOCKCHAIN\033[0m : {e}\n\n")
+                    self._next_seq = record["seq"] + len(record["blocks"])
+
+            elif "removed" in record:
+                SwagChain.remove_many(
+                    self,
+                    [
+                        seq
+                        for seq in record.get("seqs", [record.get("seq")])
+                        if seq in self._chain
+                    ],
+                )
+
+            elif "message_id" in record:
+                self._acknowledge(
+                    record.get("seqs", [record.get("seq")]),
+                    record["message_id"],
+                    record.get("asset_url"),
+                )
+
+            elif "dirty" in record:
+                self._messages.mark_dirty(record["dirty"])
+
+            elif "rewritten" in record:
+                self._messages.mark_clean(record["rewritten"])
+
+            elif "next_seq" in record:
+                self._next_seq = record["next_seq"]
+
+    async def _import_channel(self):
+        # Les messages suivants, et leurs fichiers joints, sont récupérés
+        # pendant que les précédents sont décodés et leurs blocs exécutés. Le
+        # décodage reste dans la boucle : des threads n'iraient pas plus vite
+        # sous le GIL, et se partageraient les tables d'interning des ids
+        fetched_messages = asyncio.Queue()
+        prefetch = asyncio.Semaphore(IMPORT_PREFETCH)
+
+        async def fetch_messages():
+            try:
+                async for message in self._channel.history(
+                    limit=None, oldest_first=True
+                ):
+                    await prefetch.acquire()
+                    fetched_messages.put_nowait((message, await fetch_payload(message)))
+            finally:
+                fetched_messages.put_nowait(None)
+
+        fetch_task = asyncio.create_task(fetch_messages())
+        try:
+            while (fetched_message := await fetched_messages.get()) is not None:
+                prefetch.release()
+                message, payload = fetched_message
+                self._import_message(message, decode_payload(payload))
+
+            # Remonte une éventuelle erreur de récupération de l'historique
+            await fetch_task
+        finally:
+            fetch_task.cancel()
+
+        self._log.sync()
+
+    def _import_message(self, message, blocks):
+        seqs = []
+
+        for block in blocks:
             try:
-                SwagChain.append(synced_chain, block)
-                synced_chain._messages[block.timestamp] = message.id
-                if isinstance(block, AssetUploadBlock):
-                    # Mise à jour de la bibliothèque des assets
-                    asset_url = message.attachments[0].url
-                    synced_chain._assets[block.asset_key] = asset_url
+                seq = SwagChain.append(self, block)
             except Exception as e:
                 print(f"\n\n\033[91mERREUR SUR LA BLOCKCHAIN\033[0m : {e}\n\n")
-        return synced_chain
+                continue
+
+            seqs.append(seq)
+            self._log_block(seq, block, sync=False)
+
+        if not seqs:
+            return
+
+        asset_url = (
+            message.attachments[0].url
+            if self._chain.block_class(seqs[0]) is AssetUploadBlock
+            else None
+        )
+        self._acknowledge(seqs, message.id, asset_url)
+        self._log.append(self._ack_record(seqs, message.id, asset_url), sync=False)
+
+    def _acknowledge(self, seqs, message_id, asset_url=None):
+        if message_id is None:
+            self._messages.unpublish(seqs)
+            return
+
+        self._messages.publish(seqs, message_id)
+
+        if asset_url is not None and seqs[0] in self._chain:
+            # Mise à jour de la bibliothèque des assets
+            self._assets[self._chain[seqs[0]].asset_key] = asset_url
+
+    @staticmethod
+    def _ack_record(seqs, message_id, asset_url=None):
+        record = {"seqs": seqs, "message_id": message_id}
+        if asset_url is not None:
+            record["asset_url"] = asset_url
+        return record
+
+    def _log_block(self, seq, block, sync=True):
+        record = {"seq": seq, "block": self._chain.encoded(seq)}
+        if self._profiler is None:
+            self._log.append(record, sync=sync)
+            return
+
+        with self._profiler.measure(type(block), PERSIST):
+            self._log.append(record, sync=sync)
 
     async def append(self, block):
-        SwagChain.append(self, block)
+        seq = SwagChain.append(self, block)
+        self._log_block(seq, block)
 
-        # Envoie de l'asset si le block est une demande d'upload d'asset
+        self._mirror_queue.put_nowait(seq)
+
+        # L'url d'un asset n'est connue qu'une fois le fichier envoyé sur
+        # Discord, et les blocs suivants en ont besoin : on attend donc sa
+        # publication.
         if isinstance(block, AssetUploadBlock):
-            message = await self._channel.send(
-                json.dumps(unstructure_block(block), default=json_converter),
-                file=disnake.File(block.local_path),
-            )
-            # Mise à jour de la bibliothèque des assets
-            asset_url = message.attachments[0].url
-            self._assets[block.asset_key] = asset_url
-        else:
-            message = await self._channel.send(
-                json.dumps(unstructure_block(block), default=json_converter)
+            future = asyncio.get_running_loop().create_future()
+            self._asset_futures[seq] = future
+            await future
+
+    async def append_many(self, blocks):
+        if not blocks:
+            return
+
+        seqs = SwagChain.append_many(self, blocks)
+
+        # Le groupe est écrit dans un seul enregistrement du journal, pour
+        # qu'un crash ne puisse pas en laisser seulement une partie
+        self._log.append(
+            {
+                "seq": seqs[0],
+                "blocks": [self._chain.encoded(seq) for seq in seqs],
+            }
+        )
+
+        futures = []
+        for seq, block in zip(seqs, blocks):
+            self._mirror_queue.put_nowait(seq)
+            if isinstance(block, AssetUploadBlock):
+                futures.append(asyncio.get_running_loop().create_future())
+                self._asset_futures[seq] = futures[-1]
+
+        for future in futures:
+            await future
+
+    async def remove(self, seq):
+        await self.remove_many([seq])
+
+    async def remove_many(self, seqs):
+        if not seqs:
+            return
+
+        seqs = SwagChain.remove_many(self, seqs)
+        print(f"Delation of {len(seqs)} blocks")
+
+        self._log.append({"seqs": seqs, "removed": True})
+
+        for seq in seqs:
+            self._mirror_queue.put_nowait(seq)
+
+    async def _mirror(self):
+        while True:
+            # Tous les blocs ajoutés depuis la dernière publication partent
+            # ensemble, par exemple toutes les transactions d'un partage de
+            # €agnotte
+            seqs = [await self._mirror_queue.get()]
+            while not self._mirror_queue.empty():
+                seqs.append(self._mirror_queue.get_nowait())
+
+            try:
+                await self._mirror_with_retry(seqs)
+            except Exception:
+                # Erreur définitive : les blocs sont repris un par un, pour
+                # n'écarter que ceux qui ne peuvent pas être publiés
+                for seq in seqs:
+                    try:
+                        await self._mirror_with_retry([seq])
+                    except Exception as e:
+                        self._mirror_failed(seq, e)
+
+            for _ in seqs:
+                self._mirror_queue.task_done()
+
+    async def _mirror_with_retry(self, seqs):
+        # Seules les erreurs passagères sont réessayées, les autres remontent
+        delay = 1
+        while True:
+            try:
+                await self._mirror_blocks(seqs)
+                return
+            except Exception as e:
+                print(f"\n\n\033[91mERREUR DE PUBLICATION\033[0m : {e}\n\n")
+                if not is_transient_error(e):
+                    raise
+                await asyncio.sleep(delay)
+                delay = min(2 * delay, 60)
+
+    def _mirror_failed(self, seq, error):
+        # Le bloc reste dans le journal : il sera de nouveau publié au prochain
+        # démarrage
+        print(
+            f"\n\n\033[91mERREUR DE PUBLICATION\033[0m : bloc {seq} écarté : "
+            f"{error}\n\n"
+        )
+        self._failed_seqs[seq] = error
+        if seq in self._asset_futures:
+            self._asset_futures.pop(seq).set_exception(error)
+
+    async def _mirror_blocks(self, seqs):
+        # Cette méthode peut être relancée après une erreur : seul ce qui n'a
+        # pas encore été publié ou dépublié est traité.
+        to_send = []
+        to_update = {}
+
+        for seq in seqs:
+            in_chain = seq in self._chain
+
+            if in_chain and seq not in self._messages:
+                if self._chain.block_class(seq) is AssetUploadBlock:
+                    await self._send(to_send)
+                    to_send = []
+                    await self._send_asset(seq, self._chain[seq])
+                else:
+                    to_send.append(seq)
+
+            elif not in_chain and seq in self._messages:
+                to_update.setdefault(self._messages[seq], []).append(seq)
+
+            elif in_chain and self._messages[seq] in self._messages.dirty:
+                to_update.setdefault(self._messages[seq], [])
+
+        await self._send(to_send)
+
+        to_delete = []
+        for message_id, removed_seqs in to_update.items():
+            if any(
+                seq in self._chain for seq in self._messages.published_in(message_id)
+            ):
+                await self._rewrite(message_id, removed_seqs)
+            else:
+                to_delete.append(message_id)
+
+        await self._delete(to_delete)
+
+    async def _send(self, seqs):
+        for batch in pack_blocks([(seq, self._chain.encoded(seq)) for seq in seqs]):
+            message = await self._channel.send(**message_payload(batch.values()))
+            batch_seqs = list(batch.keys())
+            self._log.append(self._ack_record(batch_seqs, message.id))
+            self._acknowledge(batch_seqs, message.id)
+            self._check_sent(message.id, batch)
+
+    def _check_sent(self, message_id, batch):
+        # Un bloc compacté ou retiré pendant son envoi a été publié dans son
+        # ancienne version : le message est à réécrire
+        stale_seqs = [
+            seq
+            for seq, encoded in batch.items()
+            if seq not in self._chain or self._chain.encoded(seq) != encoded
+        ]
+        if not stale_seqs:
+            return
+
+        self._messages.mark_dirty([message_id])
+        self._log.append({"dirty": [message_id]})
+        for seq in stale_seqs:
+            self._mirror_queue.put_nowait(seq)
+
+    async def _send_asset(self, seq, block):
+        # Envoie de l'asset si le block est une demande d'upload d'asset
+        message = await self._channel.send(
+            **message_payload([block]), file=disnake.File(block.local_path)
+        )
+        asset_url = message.attachments[0].url
+
+        self._log.append(self._ack_record([seq], message.id, asset_url))
+        self._acknowledge([seq], message.id, asset_url)
+
+        if seq in self._asset_futures:
+            self._asset_futures.pop(seq).set_result(message)
+
+    async def _rewrite(self, message_id, removed_seqs):
+        # Le message publie encore d'autres blocs : on le réécrit sans les
+        # blocs retirés, et avec les blocs remplacés à jour
+        remaining_blocks = [
+            self._chain.encoded(seq)
+            for seq in self._messages.published_in(message_id)
+            if seq in self._chain
+        ]
+
+        try:
+            await self._channel.get_partial_message(message_id).edit(
+                **message_payload(remaining_blocks), attachments=[]
             )
+        except disnake.NotFound:
+            pass
+
+        if message_id in self._messages.dirty:
+            self._messages.mark_clean(message_id)
+            self._log.append({"rewritten": message_id})
+
+        if removed_seqs:
+            self._unpublished(removed_seqs)
+
+    async def _delete(self, message_ids):
+        # Discord ne supprime en masse que les messages de moins de 14 jours,
+        # par paquets de 100. Les plus vieux sont supprimés un par un.
+        bulk_limit = disnake.utils.utcnow() - BULK_DELETE_MAX_AGE
+        recent_ids = [
+            message_id
+            for message_id in message_ids
+            if disnake.utils.snowflake_time(message_id) > bulk_limit
+        ]
+        old_ids = [
+            message_id
+            for message_id in message_ids
+            if disnake.utils.snowflake_time(message_id) <= bulk_limit
+        ]
+
+        for i in range(0, len(recent_ids), BULK_DELETE_MAX_SIZE):
+            bulk_ids = recent_ids[i : i + BULK_DELETE_MAX_SIZE]
+            try:
+                await self._channel.delete_messages(
+                    [disnake.Object(message_id) for message_id in bulk_ids]
+                )
+            except disnake.NotFound:
+                # Un message déjà supprimé fait échouer la suppression
+                old_ids.extend(bulk_ids)
+                continue
+            self._unpublished_messages(bulk_ids)
+
+        for message_id in old_ids:
+            try:
+                await self._channel.get_partial_message(message_id).delete()
+            except disnake.NotFound:
+                pass
+            self._unpublished_messages([message_id])
+
+    def _unpublished_messages(self, message_ids):
+        self._unpublished(
+            [
+                seq
+                for message_id in message_ids
+                for seq in self._messages.published_in(message_id)
+            ]
+        )
+
+    def _unpublished(self, seqs):
+        self._log.append(self._ack_record(seqs, None))
+        self._acknowledge(seqs, None)
+
+    async def compact_style_gen_blocks(self):
+        replaced_seqs, removed_seqs = SwagChain.compact_style_gen_blocks(self)
+        if not replaced_seqs and not removed_seqs:
+            return replaced_seqs, removed_seqs
+
+        print(
+            f"Compaction de la blockchain : {len(replaced_seqs) + len(removed_seqs)} "
+            f"StyleGeneration regroupés en {len(replaced_seqs)}\n"
+        )
+
+        self._messages.mark_dirty(
+            self._messages[seq] for seq in replaced_seqs if seq in self._messages
+        )
+
+        # Les blocs remplacés le sont sur place : le journal est réécrit à
+        # partir de la chaîne compactée, et un snapshot est pris sur le
+        # nouveau journal
+        self._rewrite_log(replaced_seqs, removed_seqs)
+        await self.save_snapshot()
+
+        for seq in replaced_seqs + removed_seqs:
+            self._mirror_queue.put_nowait(seq)
+
+        return replaced_seqs, removed_seqs
+
+    def _rewrite_log(self, replaced_seqs=(), removed_seqs=()):
+        """Réécrit le journal à partir de la chaîne en mémoire.
 
-        self._messages[block.timestamp] = message.id
-        # try:
-        #     self._chain.append(block)
-        #     await self._channel.send(json.dumps(unstructure_block(block)))
-        # except AttributeError:
-        #     raise ValueError(
-        #         "Trying to call `append` on a `SyncedSwagChain` instance not "
-        #         "bound to a TextChannel. Please use SyncedSwagChain.from_channel "
-        #         "to create a bounded instance."
-        #     )
-
-    async def remove(self, block):
-        SwagChain.remove(self, block)
-        print(f"Delation of {block}")
-        await self._channel.get_partial_message(
-            self._messages.pop(block.timestamp)
-        ).delete()
+        Les changements pas encore sauvegardés, et ceux des blocs `replaced_seqs`
+        et `removed_seqs` que le journal réécrit ne montre pas, sont reportés à
+        la fin du nouveau journal : les sauvegardes incrémentales reprennent
+        à partir de là.
+        """
+        manifest = load_manifest(self._backup_dir)
+        backup_changes = None
+        if manifest["log_id"] == self._log.log_id:
+            added, removed, assets = self._changes_since(manifest["log_offset"])
+            added.update(replaced_seqs)
+            added.difference_update(removed_seqs)
+            removed.extend(removed_seqs)
+            backup_changes = {
+                "seqs": sorted(added),
+                "removed": removed,
+                "assets": assets,
+            }
+
+        # Chaque message est consigné juste après son dernier bloc, comme à
+        # l'import : au rejeu, l'url d'un avatar est connue avant les blocs qui
+        # l'utilisent
+        acks = sorted(
+            (max(seqs), message_id, seqs)
+            for message_id, seqs in self._messages.messages()
+        )
+        next_ack = 0
+        records = []
+
+        def acknowledge_until(seq):
+            nonlocal next_ack
+            while next_ack < len(acks) and acks[next_ack][0] < seq:
+                _, message_id, seqs = acks[next_ack]
+                asset_url = (
+                    self._assets.get(self._chain[seqs[0]].asset_key)
+                    if seqs[0] in self._chain
+                    and self._chain.block_class(seqs[0]) is AssetUploadBlock
+                    else None
+                )
+                records.append(self._ack_record(seqs, message_id, asset_url))
+                next_ack += 1
+
+        for seq in self._chain:
+            acknowledge_until(seq)
+            records.append({"seq": seq, "block": self._chain.encoded(seq)})
+        acknowledge_until(float("inf"))
+
+        if self._messages.dirty:
+            records.append({"dirty": sorted(self._messages.dirty)})
+
+        # Les derniers blocs ont pu être retirés : le prochain numéro de
+        # séquence est conservé pour ne pas en réattribuer un
+        records.append({"next_seq": self._next_seq})
+
+        self._log.rewrite(records)
+
+        if backup_changes is not None:
+            offset = self._log.offset
+            self._log.append({"backup_changes": backup_changes})
+            relink_manifest(manifest, self._log.log_id, offset, self._backup_dir)
+
+    async def flush(self):
+        """Attend que tous les blocs en attente soient publiés dans le canal."""
+        await self._mirror_queue.join()
+
+    def state(self):
+        return {
+            **SwagChain.state(self),
+            "messages": self._messages,
+            "log_id": self._log.log_id,
+            "log_offset": self._log.offset,
+        }
+
+    def load_state(self, state):
+        SwagChain.load_state(self, state)
+        self._messages = state["messages"]
+
+    async def save_snapshot(self):
+        # Tout changement de l'état passe par le journal : s'il n'a pas bougé
+        # depuis le dernier snapshot, celui-ci est encore à jour
+        position = (self._log.log_id, self._log.offset)
+        if position == self._snapshot_position:
+            return
+
+        save_snapshot(self.state(), self._snapshot_path)
+        self._snapshot_position = position
 
     async def save_backup(self):
-        unstructured_blocks = []
+        """Sauvegarde les blocs ajoutés ou retirés depuis la dernière sauvegarde.
+
+        Les changements sont lus dans la fin du journal local, où ils sont
+        reportés quand le journal est réécrit. Une sauvegarde complète est
+        faite à partir de la chaîne en mémoire toutes les
+        INCREMENTALS_PER_ROLLUP sauvegardes, ou quand les sauvegardes n'ont
+        pas été faites sur ce journal.
+        """
+        manifest = load_manifest(self._backup_dir)
+        rollup = last_rollup(manifest)
+
+        if (
+            manifest["log_id"] != self._log.log_id
+            or rollup is None
+            or len(manifest["segments"]) - 1 - rollup >= INCREMENTALS_PER_ROLLUP
+        ):
+            kind = "full"
+            blocks = self._encoded_blocks()
+            removed = []
+            assets = dict(self._assets)
+        else:
+            kind = "incremental"
+            added, removed, assets = self._changes_since(manifest["log_offset"])
+            # Les blocs sont écrits dans l'ordre de la chaîne. Ceux refusés à
+            # l'exécution n'y sont pas.
+            blocks = [
+                (seq, self._chain.encoded(seq))
+                for seq in sorted(added)
+                if seq in self._chain
+            ]
+
+        write_segment(
+            manifest,
+            kind,
+            blocks,
+            removed,
+            assets,
+            self._log.log_id,
+            self._log.offset,
+            self._backup_dir,
+        )
+
+    def _changes_since(self, offset):
+        # Numéros de séquence des blocs ajoutés ou remplacés et des blocs
+        # retirés, et assets publiés, d'après les enregistrements du journal
+        # écrits depuis `offset`
+        added = set()
+        removed = []
+        assets = {}
 
-        async for message in self._channel.history(limit=None, oldest_first=True):
-            unstructured_blocks.append(json.loads(message.content))
+        for _, record in self._log.records(offset):
+            if "block" in record:
+                added.add(record["seq"])
+            elif "blocks" in record:
+                added.update(
+                    range(record["seq"], record["seq"] + len(record["blocks"]))
+                )
+            elif "removed" in record:
+                # Un bloc retiré peut avoir été sauvegardé, même s'il a été
+                # remplacé depuis
+                seqs = record.get("seqs", [record.get("seq")])
+                added.difference_update(seqs)
+                removed.extend(seqs)
+            elif "backup_changes" in record:
+                # Changements reportés lors de la réécriture du journal
+                backup_changes = record["backup_changes"]
+                added.update(backup_changes["seqs"])
+                removed.extend(backup_changes["removed"])
+                assets.update(backup_changes["assets"])
+            elif "asset_url" in record and record["seqs"][0] in self._chain:
+                assets[self._chain[record["seqs"][0]].asset_key] = record["asset_url"]
 
-        with open("swagchain.bk", "wb") as backup_file:
-            cbor2.dump(unstructured_blocks, backup_file)
+        return added, removed, assets
@@ -0,0 +1,340 @@
+import base64
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+import typing
+from typing import Dict, Iterable, List, Optional, Union
+
+from arrow import Arrow
+import cbor2
+from dateutil.tz import tzoffset
+
+from swag.block import Block
+from swag.currencies import Style, Swag
+from swag.errors import InvalidStyleValue
+from swag.id import (
+    AccountId,
+    CagnotteId,
+    GenericId,
+    UserId,
+    YfuId,
+    get_id_from_str,
+)
+
+from .blockchain_parser import block_types, converter
+
+# Format binaire des blocs publiés dans le canal : une liste CBOR
+# [WIRE_FORMAT_VERSION, [bloc, ...]], chaque bloc étant un dictionnaire dont
+# les clés sont les numéros ci-dessous plutôt que les noms des champs.
+# Incrémenter la version dès que l'encodage d'un champ change.
+WIRE_FORMAT_VERSION = 1
+
+# Dans le contenu d'un message, la charge CBOR est encodée en base85 et
+# précédée de ce préfixe, qui la distingue des anciens messages JSON
+WIRE_PREFIX = "swag85:"
+
+# Ne jamais réattribuer un numéro : seuls de nouveaux peuvent être ajoutés.
+# Une classe ou un champ absent des tables est encodé sous son nom.
+BLOCK_TYPE_TAG = 0
+BLOCK_TAGS = {
+    "AccountCreation": 1,
+    "AccountDeletion": 2,
+    "Mining": 3,
+    "Transaction": 4,
+    "SwagBlocking": 5,
+    "ReturnOnInvestment": 6,
+    "StyleGeneration": 7,
+    "CagnotteCreation": 8,
+    "CagnotteRenaming": 9,
+    "CagnotteParticipantsReset": 10,
+    "CagnotteDeletion": 11,
+    "CagnotteAddManagerBlock": 12,
+    "CagnotteRevokeManagerBlock": 13,
+    "CagnotteAddRankBlock": 14,
+    "CagnotteAddAccountToRankBlock": 15,
+    "CagnotteRemoveAccountToRankBlock": 16,
+    "CagnotteRemoveRankBlock": 17,
+    "ServiceCreation": 18,
+    "UseService": 19,
+    "CancelService": 20,
+    "ServiceDelation": 21,
+    "YfuGenerationBlock": 22,
+    "RenameYfuBlock": 23,
+    "TokenTransactionBlock": 24,
+    "YfuPowerActivation": 25,
+    "SacrificeYfuBlock": 26,
+    "UserTimezoneUpdate": 27,
+    "GuildTimezoneUpdate": 28,
+    "EventGiveaway": 29,
+    "AssetUploadBlock": 30,
+}
+FIELD_TAGS = {
+    "timestamp": 1,
+    "issuer_id": 2,
+    "user_id": 3,
+    "amount": 4,
+    "amounts": 5,
+    "harvest": 6,
+    "giver_id": 7,
+    "recipient_id": 8,
+    "timezone": 9,
+    "cagnotte_id": 10,
+    "name": 11,
+    "creator": 12,
+    "new_name": 13,
+    "new_manager": 14,
+    "manager_id": 15,
+    "rank": 16,
+    "rank_name": 17,
+    "account_to_add": 18,
+    "account_to_remove": 19,
+    "service": 20,
+    "service_id": 21,
+    "yfu_id": 22,
+    "first_name": 23,
+    "last_name": 24,
+    "clan": 25,
+    "power_points": 26,
+    "initial_activation_cost": 27,
+    "avatar_asset_key": 28,
+    "power": 29,
+    "new_first_name": 30,
+    "token_id": 31,
+    "account_id": 32,
+    "targets": 33,
+    "sacrified_yfu_id": 34,
+    "upgraded_yfu_id": 35,
+    "guild_id": 36,
+    "asset_key": 37,
+    "local_path": 38,
+}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+UTC = tzoffset(None, 0)
+
+
+def encode_timestamp(timestamp: Arrow):
+    # Microsecondes depuis l'epoch, avec le décalage horaire s'il n'est pas nul
+    microseconds = (timestamp.datetime - EPOCH) // MICROSECOND
+    offset = int(timestamp.utcoffset().total_seconds())
+    return [microseconds, offset] if offset else microseconds
+
+
+def decode_timestamp(value) -> Arrow:
+    if isinstance(value, list):
+        microseconds, offset = value
+        tz = tzoffset(None, offset)
+    else:
+        microseconds, tz = value, UTC
+    return Arrow.fromdatetime(
+        EPOCH.astimezone(tz) + timedelta(microseconds=microseconds)
+    )
+
+
+def encode_style(style: Style) -> int:
+    # Le $tyle est déjà tenu en entier de dix-millièmes
+    return style.units
+
+
+# Les montants et les ids sont immuables et reviennent d'un bloc à l'autre :
+# une même instance est partagée plutôt que reconstruite à chaque lecture
+@lru_cache(maxsize=4096)
+def decode_style(units: int) -> Style:
+    if units < 0:
+        raise InvalidStyleValue
+    return Style.from_units(units)
+
+
+def encode_money(money: Union[Swag, Style]):
+    if type(money) is Swag:
+        return [0, money.value]
+    return [1, encode_style(money)]
+
+
+def decode_money(value) -> Union[Swag, Style]:
+    currency, units = value
+    return Swag(units) if currency == 0 else decode_style(units)
+
+
+@lru_cache(maxsize=4096)
+def decode_id(value) -> GenericId:
+    return UserId(value) if type(value) is int else get_id_from_str(value)
+
+
+def _value_codec(value_type):
+    """Fonctions d'encodage et de décodage d'une valeur de ce type.
+
+    Un décodeur None laisse passer la valeur telle quelle.
+    """
+    if value_type is Arrow:
+        return encode_timestamp, decode_timestamp
+    if value_type is Swag:
+        return (lambda swag: swag.value), Swag
+    if value_type is Style:
+        return encode_style, decode_style
+    if value_type == Union[Swag, Style]:
+        return encode_money, decode_money
+    if value_type in (UserId, CagnotteId, YfuId):
+        return (lambda id: id.id), lru_cache(maxsize=4096)(value_type)
+    if value_type in (AccountId, GenericId):
+        return (lambda id: id.id), decode_id
+    if value_type is dict:
+        # Dictionnaire de valeurs simples, stocké tel quel
+        return (lambda d: d), None
+
+    origin = typing.get_origin(value_type)
+    args = typing.get_args(value_type)
+    if origin is Union and type(None) in args and len(args) == 2:
+        (item_type,) = [arg for arg in args if arg is not type(None)]
+        encode_item, decode_item = _value_codec(item_type)
+        return (
+            lambda value: None if value is None else encode_item(value),
+            decode_item
+            and (lambda value: None if value is None else decode_item(value)),
+        )
+    if origin in (dict, Dict):
+        key_type, item_type = typing.get_args(value_type)
+        encode_key, decode_key = _value_codec(key_type)
+        encode_item, decode_item = _value_codec(item_type)
+        decode_key = decode_key or (lambda key: key)
+        decode_item = decode_item or (lambda item: item)
+        return (
+            lambda d: {encode_key(k): encode_item(v) for k, v in d.items()},
+            lambda d: {decode_key(k): decode_item(v) for k, v in d.items()},
+        )
+    if origin in (list, List):
+        (item_type,) = typing.get_args(value_type)
+        encode_item, decode_item = _value_codec(item_type)
+        return (
+            lambda items: [encode_item(item) for item in items],
+            decode_item and (lambda items: [decode_item(item) for item in items]),
+        )
+
+    if value_type in (int, str):
+        return (lambda value: value), None
+
+    # Les autres valeurs sont stockées sous leur forme déstructurée
+    if value_type is None:
+        return converter.unstructure, None
+
+    return (
+        lambda value: converter.unstructure(value, unstructure_as=value_type),
+        lambda value: converter.structure(value, value_type),
+    )
+
+
+def compile_wire_codec(block_class):
+    """Fonctions d'encodage et de décodage d'une classe de bloc."""
+    block_tag = BLOCK_TAGS.get(block_class.__name__, block_class.__name__)
+    fields = [
+        (
+            attribute.name,
+            attribute.name[1:] if attribute.name.startswith("_") else attribute.name,
+            FIELD_TAGS.get(attribute.name, attribute.name),
+        )
+        + _value_codec(attribute.type)
+        for attribute in block_class.__attrs_attrs__
+    ]
+
+    def encode(block):
+        wire_block = {BLOCK_TYPE_TAG: block_tag}
+        for name, _, tag, encode_value, _ in fields:
+            wire_block[tag] = encode_value(getattr(block, name))
+        return wire_block
+
+    def decode(wire_block):
+        kwargs = {}
+        for _, init_name, tag, _, decode_value in fields:
+            if tag in wire_block:
+                value = wire_block[tag]
+                kwargs[init_name] = (
+                    value if decode_value is None else decode_value(value)
+                )
+        return block_class(**kwargs)
+
+    return encode, decode
+
+
+wire_encoders = {}
+wire_decoders = {}
+tagged_block_classes = {}
+
+for block_class in block_types.values():
+    block_tag = BLOCK_TAGS.get(block_class.__name__, block_class.__name__)
+    wire_encoders[block_class], wire_decoders[block_tag] = compile_wire_codec(
+        block_class
+    )
+    tagged_block_classes[block_tag] = block_class
+
+
+def encode_block(block) -> bytes:
+    """Bloc encodé en CBOR, à regrouper avec d'autres par `pack_payload`."""
+    try:
+        encode = wire_encoders[type(block)]
+    except KeyError:
+        encode, _ = compile_wire_codec(type(block))
+        wire_encoders[type(block)] = encode
+    return cbor2.dumps(encode(block))
+
+
+def decode_block(encoded_block: bytes) -> Block:
+    wire_block = cbor2.loads(encoded_block)
+    return wire_decoders[wire_block[BLOCK_TYPE_TAG]](wire_block)
+
+
+def peek_block_class(data: bytes, offset: int = 0) -> Optional[type]:
+    """Classe du bloc encodé à cette position, sans décoder le bloc.
+
+    Un bloc encodé commence par l'en-tête de son dictionnaire, sur un octet,
+    puis par la clé BLOCK_TYPE_TAG et le numéro de sa classe. Renvoie None si
+    la classe est encodée sous son nom.
+    """
+    if data[offset + 1] != BLOCK_TYPE_TAG:
+        return None
+
+    # Un entier CBOR inférieur à 24 tient dans son octet d'en-tête, un entier
+    # inférieur à 256 dans l'octet suivant
+    header = data[offset + 2]
+    if header < 24:
+        return tagged_block_classes[header]
+    if header == 24:
+        return tagged_block_classes[data[offset + 3]]
+    return None
+
+
+def pack_payload(encoded_blocks: Iterable[bytes]) -> bytes:
+    """Charge CBOR publiant des blocs déjà encodés par `encode_block`."""
+    # Liste de taille indéfinie : les blocs encodés sont simplement mis bout
+    # à bout, sans avoir à les décoder
+    return (
+        b"\x82"
+        + cbor2.dumps(WIRE_FORMAT_VERSION)
+        + b"\x9f"
+        + b"".join(encoded_blocks)
+        + b"\xff"
+    )
+
+
+def unpack_payload(payload: bytes) -> List[Block]:
+    """Blocs publiés dans une charge CBOR."""
+    version, wire_blocks = cbor2.loads(payload)
+    if version != WIRE_FORMAT_VERSION:
+        raise ValueError(f"Version du format des blocs inconnue : {version}")
+
+    return [
+        wire_decoders[wire_block[BLOCK_TYPE_TAG]](wire_block)
+        for wire_block in wire_blocks
+    ]
+
+
+def to_text(payload: bytes) -> str:
+    return WIRE_PREFIX + base64.b85encode(payload).decode()
+
+
+def from_text(text: str) -> bytes:
+    return base64.b85decode(text[len(WIRE_PREFIX) :])
+
+
+def text_length(payload_size: int) -> int:
+    """Longueur du texte publiant une charge CBOR de cette taille."""
+    return len(WIRE_PREFIX) + -(-payload_size // 4) * 5
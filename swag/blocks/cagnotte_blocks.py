@@ -90,6 +90,7 @@ class CagnotteParticipantsReset(Block):
 class CagnotteDeletion(Block):
     cagnotte_id = attrib(type=CagnotteId, converter=CagnotteId)
     user_id = attrib(type=UserId, converter=UserId)
+    changes_bonuses = True
 
     @user_id.default
     def _user_id_default(self):
@@ -266,6 +267,7 @@ class ServiceDelation(Block):
     user_id = attrib(type=UserId, converter=UserId)
     cagnotte_id = attrib(type=CagnotteId, converter=CagnotteId)
     service_id = attrib(type=int)
+    changes_bonuses = True
 
     def execute(self, db: SwagChain):
         cagnotte = db._accounts[self.cagnotte_id]
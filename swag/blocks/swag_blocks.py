@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Union
+from typing import TYPE_CHECKING, List, Optional, Union
 
 from swag.id import CagnotteId, UserId
 from swag.assert_timezone import assert_timezone
@@ -44,13 +44,18 @@ class AccountCreation(Block):
 @attrs(frozen=True, kw_only=True)
 class AccountDeletion(Block):
     user_id = attrib(type=UserId, converter=UserId)
+    changes_bonuses = True
 
     def validate(self, db: SwagChain):
         if self.user_id not in db._accounts:
             raise AccountAlreadyExist
 
     def execute(self, db: SwagChain):
-        account = db._accounts.users.pop(self.user_id)
+        # Suppression par `Accounts`, qui retire aussi le compte du classement
+        account = db._accounts[self.user_id]
+        del db._accounts[self.user_id]
+        # La vue du compte supprimé ne doit pas rester en cache
+        db._views.pop(self.user_id, None)
         dev_cagnotte = db._accounts[CagnotteId("€")]
 
         dev_cagnotte += account.swag_balance
@@ -76,7 +81,8 @@ class Uncomputed:
 class Mining(Block):
     user_id = attrib(type=UserId, converter=UserId)
     amount = attrib(type=Swag, default=Uncomputed)
-    harvest = attrib(type=Union[dict, None], default=None)
+    # Tirages du minage, dans l'ordre croissant des résultats
+    harvest = attrib(type=Optional[List[dict]], default=None)
 
     def execute(self, db: SwagChain):
         user_account = db._accounts[self.user_id]
@@ -90,7 +96,9 @@ class Mining(Block):
             raise AlreadyMineToday
 
         if self.amount is Uncomputed:
-            rolls = sorted(bonuses.roll() for _ in range(bonuses.minings))
+            rolls = sorted(
+                bonuses.roll_many(bonuses.minings), key=lambda roll: roll["result"]
+            )
             self.__dict__["amount"] = Swag(sum([roll["result"] for roll in rolls]))
             self.__dict__["harvest"] = rolls
 
@@ -104,6 +112,9 @@ class Transaction(Block):
     recipient_id = attrib(type=Union[UserId, CagnotteId])
     amount = attrib(type=Union[Swag, Style])
 
+    def touched_accounts(self):
+        return (self.giver_id, self.recipient_id)
+
     def execute(self, db: SwagChain):
         if type(self.giver_id) is CagnotteId:
             if self.issuer_id not in db._accounts[self.giver_id].managers:
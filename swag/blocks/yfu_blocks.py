@@ -38,6 +38,7 @@ class YfuGenerationBlock(Block):
     initial_activation_cost = attrib(type=Style)
     avatar_asset_key = attrib(type=str)
     power = attrib(type=Power)
+    changes_bonuses = True
 
     @first_name.default
     def _generate_letter(self):
@@ -79,6 +80,7 @@ class YfuPowerActivation(Block):
     account_id = attrib(type=Union[UserId, CagnotteId])
     yfu_id = attrib(type=YfuId, converter=YfuId)
     targets = attrib(type=List[GenericId])
+    changes_bonuses = True
 
     def validate(self, db: SwagChain):
         if self.account_id != db._yfus[self.yfu_id].owner_id:
@@ -99,6 +101,7 @@ class TokenTransactionBlock(Block):
     giver_id = attrib(type=Union[UserId, CagnotteId])
     recipient_id = attrib(type=Union[UserId, CagnotteId])
     token_id = attrib(type=YfuId)
+    changes_bonuses = True
 
     def validate(self, db: SwagChain):
         if self.giver_id != db._yfus[self.token_id].owner_id:
@@ -133,6 +136,7 @@ class SacrificeYfuBlock(Block):
     user_id = attrib(type=UserId, converter=UserId)
     sacrified_yfu_id = attrib(type=YfuId, converter=YfuId)
     upgraded_yfu_id = attrib(type=YfuId, converter=YfuId)
+    changes_bonuses = True
 
     def validate(self, db: SwagChain):
         if self.user_id != db._yfus[self.sacrified_yfu_id].owner_id:
@@ -1,7 +1,70 @@
-from numpy import round, abs
-from numpy.random import Generator, Philox
+from typing import Optional
 
-rng = Generator(Philox())
+import numpy as np
+from numpy.random import Generator, Philox, SeedSequence
+
+# Nombre de tirages de la loi de Cauchy faits d'un coup
+POOL_SIZE = 4096
+
+
+class CauchyPool:
+    """Réserve de tirages de la loi de Cauchy standard, remplie par paquets.
+
+    Les tirages sont rendus dans l'ordre où le générateur les a faits : la
+    suite des valeurs rendues est celle de tirages faits un à un, quelle que
+    soit la taille des paquets, et ne dépend donc que de la graine.
+    """
+
+    def __init__(self, generator: Generator, size: int = POOL_SIZE):
+        self._generator = generator
+        self._size = size
+        self._buffer = np.empty(0)
+        self._next = 0
+
+    def _refill(self, n: int):
+        # Les tirages restants passent en tête du nouveau paquet
+        available = len(self._buffer) - self._next
+        self._buffer = np.concatenate(
+            (
+                self._buffer[self._next :],
+                self._generator.standard_cauchy(max(self._size, n - available)),
+            )
+        )
+        self._next = 0
+
+    def take(self, n: int) -> np.ndarray:
+        """Les `n` tirages suivants."""
+        if self._next + n > len(self._buffer):
+            self._refill(n)
+
+        samples = self._buffer[self._next : self._next + n]
+        self._next += n
+        return samples
+
+    def next(self) -> float:
+        """Le tirage suivant."""
+        if self._next == len(self._buffer):
+            self._refill(1)
+
+        sample = self._buffer[self._next]
+        self._next += 1
+        return float(sample)
+
+
+def _generators(seed: Optional[int] = None):
+    # Les tirages de Cauchy ont leur propre flux : ceux faits d'avance ne
+    # décalent pas les autres tirages
+    choice_seed, cauchy_seed = SeedSequence(seed).spawn(2)
+    return Generator(Philox(choice_seed)), CauchyPool(Generator(Philox(cauchy_seed)))
+
+
+rng, pool = _generators()
+
+
+def seed(value: int):
+    """Fixe la graine de tous les tirages, pour les rendre reproductibles."""
+    global rng, pool
+    rng, pool = _generators(value)
 
 
 def roll(loc, scale):
@@ -15,8 +78,18 @@ def roll(loc, scale):
     Returns:
         int: Nombre aléatoire généré.
     """
-    rv = rng.standard_cauchy() * scale + loc
-    return int(abs(round(rv)))
+    rv = pool.next() * scale + loc
+    # Arrondi au plus proche, à égalité vers le pair, comme pour `roll_array`
+    return abs(round(rv))
+
+
+def roll_array(loc, scale, n: int) -> np.ndarray:
+    """`n` tirages de `roll`, calculés d'un seul coup.
+
+    Les valeurs restent des flottants entiers : la queue de la loi de Cauchy
+    dépasse parfois les entiers NumPy, elles sont converties par `int`.
+    """
+    return np.abs(np.round(pool.take(n) * scale + loc))
 
 
 def choice(a, size=None, replace=True, p=None):
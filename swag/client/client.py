@@ -5,6 +5,7 @@ from swag.client.swagdmin import SwagminCommand
 from swag.client.cagnotte import CagnotteCommand
 from swag.client.swag import SwagCommand
 from swag.blockchain import SyncedSwagChain
+from swag.blockchain.profiler import BlockProfiler
 from swag.client.yfu import YfuCommand
 from swag.errors import (
     CagnotteNameAlreadyExist,
@@ -47,6 +48,8 @@ from ..utils import (
 )
 
 from utils import (
+    BLOCK_PROFILER,
+    BLOCK_PROFILER_ALLOCATIONS,
     COMMAND_CHANNEL_ID,
     GUILD_ID,
     LOG_CHANNEL_ID,
@@ -70,6 +73,7 @@ class SwagClient(Module):
         self.the_swaggest = None
         self.last_update = None
         self.last_backup = None
+        self.swagchain = None
 
     def register_commands(self):
         self.discord_client.add_cog(SwagCommand(self))
@@ -82,7 +86,13 @@ class SwagClient(Module):
         self.swagchain = await SyncedSwagChain.from_channel(
             self.discord_client.user.id,
             self.discord_client.get_channel(SWAGCHAIN_CHANNEL_ID),
+            profiler=(
+                BlockProfiler(BLOCK_PROFILER_ALLOCATIONS) if BLOCK_PROFILER else None
+            ),
         )
+        # Colonnes des comptes, pour la génération horaire du $tyle
+        self.swagchain._accounts.enable_columns()
+
         print("Mise à jour du classement et des bonus de blocage\n\n")
         await update_forbes_classement(
             self.discord_client.get_guild(GUILD_ID),
@@ -92,6 +102,16 @@ class SwagClient(Module):
 
         await self.swagchain.clean_old_style_gen_block()
 
+        # Snapshot de l'état rejoué, pour que le prochain démarrage n'ait que
+        # la fin du journal à rejouer. La compaction, qui réécrit tout le
+        # journal, est laissée à la tâche planifiée.
+        await self.swagchain.save_snapshot()
+
+    def shutdown(self):
+        # Le profil de l'ajout des blocs est enregistré à l'arrêt du bot
+        if self.swagchain is not None and self.swagchain._profiler is not None:
+            self.swagchain._profiler.dump()
+
     async def add_jobs(self, scheduler):
         # Programme la fonction update_the_style pour être lancée
         # toutes les heures.
@@ -107,10 +127,21 @@ class SwagClient(Module):
                 self.last_backup = now
                 await self.swagchain.save_backup()
 
+        async def snapshot_job():
+            await self.swagchain.save_snapshot()
+
+        async def compaction_job():
+            await self.swagchain.compact_style_gen_blocks()
+
         # Génération du style toute les heures
         scheduler.add_job(style_job, CronTrigger(hour="*"))
         # Sauvegarde de la swagchain en local tout les jours à 4h du matin
         scheduler.add_job(backup_job, CronTrigger(day="*", hour="4"))
+        # Compaction des StyleGeneration tous les jours à 3h du matin, avant
+        # la sauvegarde
+        scheduler.add_job(compaction_job, CronTrigger(day="*", hour="3"))
+        # Snapshot de l'état de la swagchain toutes les heures, à la demie
+        scheduler.add_job(snapshot_job, CronTrigger(hour="*", minute="30"))
 
     async def handle_services_payments_interaction(
         self,
@@ -1,14 +1,20 @@
 from abc import ABCMeta, abstractmethod
 from decimal import ROUND_DOWN, Decimal
 from enum import Enum
-from attr import attrs, attrib
 from swag.errors import InvalidStyleValue, InvalidSwagValue
 
 from utils import format_number
 
 
-@attrs(frozen=True)
 class Money(metaclass=ABCMeta):
+    """Montant immuable d'une monnaie.
+
+    Les montants sont validés à leur construction, puis les opérations entre
+    montants valides ne vérifient que ce qui peut les rendre invalides.
+    """
+
+    __slots__ = ()
+
     @property
     @abstractmethod
     def _CURRENCY(self) -> str:
@@ -20,13 +26,40 @@ class Money(metaclass=ABCMeta):
         raise NotImplementedError
 
     def __str__(self) -> str:
-        return f"{format_number(self.value)} {self._CURRENCY}"
+        return f"{format_number(self.value)} {self._CURRENCY}"
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(value={self.value!r})"
+
+    # Un montant immuable n'a pas besoin d'être copié, notamment par la copie
+    # de l'état de la chaîne avant un groupe de blocs
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
 
-@attrs(frozen=True)
 class Swag(Money):
-    value: int = attrib(converter=int)
-    _CURRENCY: str = "$wag"
+    __slots__ = ("_value",)
+    _CURRENCY = "$wag"
+
+    def __init__(self, value):
+        value = int(value)
+        if value < 0:
+            raise InvalidSwagValue
+        self._value = value
+
+    @classmethod
+    def _of(cls, value: int) -> "Swag":
+        # Construction sans conversion ni validation, pour un résultat déjà sûr
+        swag = object.__new__(cls)
+        swag._value = value
+        return swag
+
+    @property
+    def value(self) -> int:
+        return self._value
 
     @classmethod
     def from_human_readable(cls, text: str):
@@ -35,50 +68,102 @@ class Swag(Money):
         except ValueError:
             raise InvalidSwagValue
 
-    @value.validator
-    def _check_amount(self, attribute, value):
-        if value < 0:
-            raise InvalidSwagValue
-
     def __add__(self, other):
-        if isinstance(other, Swag):
-            return Swag(self.value + other.value)
+        if type(other) is Swag:
+            return Swag._of(self._value + other._value)
         else:
-            return Swag(self.value + other)
+            return Swag(self._value + other)
 
-    def __radd__(self, other):
-        if isinstance(other, Swag):
-            return Swag(self.value + other.value)
-        else:
-            return Swag(self.value + other)
+    __radd__ = __add__
 
     def __sub__(self, other: "Swag"):
-        return Swag(self.value - other.value)
+        value = self._value - other._value
+        if value < 0:
+            raise InvalidSwagValue
+        return Swag._of(value)
 
     def __pos__(self):
         return self
 
     def __neg__(self):
-        if self.value == 0:
+        if self._value == 0:
             return self
         else:
             raise InvalidSwagValue
 
     def __int__(self):
-        return self.value
+        return self._value
+
+    def __eq__(self, other):
+        if type(other) is not Swag:
+            return NotImplemented
+        return self._value == other._value
+
+    def __lt__(self, other):
+        if type(other) is not Swag:
+            return NotImplemented
+        return self._value < other._value
+
+    def __le__(self, other):
+        if type(other) is not Swag:
+            return NotImplemented
+        return self._value <= other._value
+
+    def __gt__(self, other):
+        if type(other) is not Swag:
+            return NotImplemented
+        return self._value > other._value
 
+    def __ge__(self, other):
+        if type(other) is not Swag:
+            return NotImplemented
+        return self._value >= other._value
 
-def style_decimal(amount):
+    def __hash__(self):
+        return hash((Swag, self._value))
+
+    def __reduce__(self):
+        return Swag._of, (self._value,)
+
+
+# Le $tyle est compté en dix-millièmes
+STYLE_SCALE = 4
+STYLE_UNIT = Decimal(1).scaleb(-STYLE_SCALE)
+
+
+def style_units(amount) -> int:
+    """Nombre de dix-millièmes d'un montant de $tyle, arrondi vers le bas."""
     if type(amount) is Style:
-        return amount.value
-    else:
-        return Decimal(amount).quantize(Decimal(".0001"), rounding=ROUND_DOWN)
+        return amount._units
+    return int(
+        Decimal(amount).quantize(STYLE_UNIT, rounding=ROUND_DOWN).scaleb(STYLE_SCALE)
+    )
 
 
-@attrs(frozen=True)
 class Style(Money):
-    value: Decimal = attrib(converter=style_decimal)
-    _CURRENCY: str = "$tyle"
+    __slots__ = ("_units",)
+    _CURRENCY = "$tyle"
+
+    def __init__(self, value):
+        units = style_units(value)
+        if units < 0:
+            raise InvalidStyleValue
+        self._units = units
+
+    @classmethod
+    def from_units(cls, units: int) -> "Style":
+        """$tyle de ce nombre de dix-millièmes, déjà valide."""
+        style = object.__new__(cls)
+        style._units = units
+        return style
+
+    @property
+    def units(self) -> int:
+        return self._units
+
+    @property
+    def value(self) -> Decimal:
+        return Decimal(self._units).scaleb(-STYLE_SCALE)
 
     @classmethod
     def from_human_readable(cls, text: str):
@@ -87,18 +172,21 @@ class Style(Money):
         except ValueError:
             raise InvalidStyleValue
 
-    @value.validator
-    def _check_amount(self, attribute, value):
-        if value < 0:
-            raise InvalidStyleValue
-
     def __add__(self, other: "Style"):
-        return Style(self.value + other.value)
+        return Style.from_units(self._units + other._units)
 
     def __sub__(self, other: "Style"):
-        return Style(self.value - other.value)
+        units = self._units - other._units
+        if units < 0:
+            raise InvalidStyleValue
+        return Style.from_units(units)
 
     def __mul__(self, other: Decimal):
+        if type(other) is int:
+            units = self._units * other
+            if units < 0:
+                raise InvalidStyleValue
+            return Style.from_units(units)
         return Style(self.value * other)
 
     __rmul__ = __mul__
@@ -107,11 +195,42 @@ class Style(Money):
         return self
 
     def __neg__(self):
-        if self.value == 0:
+        if self._units == 0:
             return self
         else:
             raise InvalidStyleValue
 
+    def __eq__(self, other):
+        if type(other) is not Style:
+            return NotImplemented
+        return self._units == other._units
+
+    def __lt__(self, other):
+        if type(other) is not Style:
+            return NotImplemented
+        return self._units < other._units
+
+    def __le__(self, other):
+        if type(other) is not Style:
+            return NotImplemented
+        return self._units <= other._units
+
+    def __gt__(self, other):
+        if type(other) is not Style:
+            return NotImplemented
+        return self._units > other._units
+
+    def __ge__(self, other):
+        if type(other) is not Style:
+            return NotImplemented
+        return self._units >= other._units
+
+    def __hash__(self):
+        return hash((Style, self._units))
+
+    def __reduce__(self):
+        return Style.from_units, (self._units,)
+
 
 class Currency(str, Enum):
     """
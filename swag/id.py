@@ -1,12 +1,107 @@
 import re
+from functools import lru_cache
 from typing import Union
-from attr import attrib, attrs
+
+from attr.exceptions import FrozenInstanceError
 
 from .errors import InvalidCagnotteId, InvalidId, InvalidYfuId
 
 
+class InternedId:
+    """Identifiant immuable, dont chaque valeur n'existe qu'en un exemplaire.
+
+    La conversion et la validation n'ont lieu qu'à la première construction
+    d'une valeur : les suivantes renvoient le même objet, dont le hash est
+    gardé. Les dictionnaires indexés par identifiant trouvent ainsi leurs
+    clefs par identité, sans comparer les valeurs.
+    """
+
+    __slots__ = ("id", "_hash")
+
+    def __new__(cls, value):
+        if type(value) is cls:
+            return value
+
+        # Les entiers et les chaînes déjà vus sont retrouvés tels quels
+        fast = type(value) is int or type(value) is str
+        if fast:
+            instance = cls._interned.get(value)
+            if instance is not None:
+                return instance
+
+        id = cls._convert(value)
+        instance = cls._interned.get(id)
+        if instance is None:
+            cls._validate(id)
+            instance = object.__new__(cls)
+            object.__setattr__(instance, "id", id)
+            object.__setattr__(instance, "_hash", hash((cls.__name__, id)))
+            cls._interned[id] = instance
+        if fast:
+            cls._interned[value] = instance
+        return instance
+
+    @staticmethod
+    def _convert(value):
+        raise NotImplementedError
+
+    @staticmethod
+    def _validate(id):
+        pass
+
+    def __setattr__(self, name, value):
+        raise FrozenInstanceError()
+
+    def __delattr__(self, name):
+        raise FrozenInstanceError()
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.id == other.id
+
+    def __lt__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.id < other.id
+
+    def __le__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.id <= other.id
+
+    def __gt__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.id > other.id
+
+    def __ge__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.id >= other.id
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(id={self.id!r})"
+
+    # Les copies, comme les snapshots relus, reviennent à l'exemplaire unique
+    def __reduce__(self):
+        return type(self), (self.id,)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
 user_id_regex = re.compile("^\d+$", re.A)
 
+
 def user_id_converter(user_id):
     if type(user_id) is UserId:
         return user_id.id
@@ -14,9 +109,10 @@ def user_id_converter(user_id):
         return int(user_id)
 
 
-@attrs(frozen=True, auto_attribs=True)
-class UserId:
-    id: int = attrib(converter=user_id_converter)
+class UserId(InternedId):
+    __slots__ = ()
+    _interned = {}
+    _convert = staticmethod(user_id_converter)
 
     def __str__(self) -> str:
         return f"<@{self.id}>"
@@ -32,14 +128,15 @@ def cagnotte_id_converter(cagnotte_id):
         return str(cagnotte_id)
 
 
-@attrs(frozen=True, auto_attribs=True)
-class CagnotteId:
-    id: str = attrib(converter=cagnotte_id_converter)
+class CagnotteId(InternedId):
+    __slots__ = ()
+    _interned = {}
+    _convert = staticmethod(cagnotte_id_converter)
 
-    @id.validator
-    def _validate(self, attribute, value):
-        if not re.match(cagnotte_id_regex, value):
-            raise InvalidCagnotteId(value)
+    @staticmethod
+    def _validate(id):
+        if not cagnotte_id_regex.match(id):
+            raise InvalidCagnotteId(id)
 
     def __str__(self) -> str:
         return self.id
@@ -57,25 +154,27 @@ def yfu_id_converter(yfu_id):
         return str(yfu_id)
 
 
-@attrs(frozen=True, auto_attribs=True)
-class YfuId:
-    id: str = attrib(converter=yfu_id_converter)
+class YfuId(InternedId):
+    __slots__ = ()
+    _interned = {}
+    _convert = staticmethod(yfu_id_converter)
 
-    @id.validator
-    def _validate(self, attribute, value):
-        if not re.match(yfu_id_regex, value):
+    @staticmethod
+    def _validate(id):
+        if not yfu_id_regex.match(id):
             raise InvalidYfuId
 
     def __str__(self) -> str:
         return self.id
 
 
-def get_id_from_str(id : str) -> Union[UserId, CagnotteId, YfuId]:
-    if re.match(yfu_id_regex, id):
+@lru_cache(maxsize=4096)
+def get_id_from_str(id: str) -> Union[UserId, CagnotteId, YfuId]:
+    if yfu_id_regex.match(id):
         return YfuId(id)
-    if re.match(cagnotte_id_regex,id):
+    if cagnotte_id_regex.match(id):
         return CagnotteId(id)
-    if re.match(user_id_regex, id):
+    if user_id_regex.match(id):
         return UserId(id)
     raise InvalidId
 
@@ -172,7 +172,7 @@ class TaxEvasion(Active):
         ):
             raise NotImplementedError
 
-        amounts = [Swag(bonuses.roll()["result"]) for _ in range(self._x_value)]
+        amounts = [Swag(roll["result"]) for roll in bonuses.roll_many(self._x_value)]
         owner += sum(amounts)
 
 
@@ -1,4 +1,5 @@
 from decimal import Decimal, ROUND_UP
+import numpy as np
 from numpy import log1p, sqrt, expm1
 
 from swag.currencies import Style
@@ -9,6 +10,11 @@ BLOCKING_TIME = 3
 STYLA = 1.9712167541353567
 STYLB = 6.608024397705518e-07
 
+# Les calculs vectorisés sont faits en flottants, puis arrondis comme le feraient
+# les Decimal : un résultat à moins de cette distance d'un arrondi est incertain,
+# et doit être recalculé exactement
+ROUNDING_MARGIN = 1e-6
+
 
 def stylog(swag_amount):
     return Decimal(STYLA * log1p(STYLB * swag_amount))
@@ -24,3 +30,52 @@ def unit_style_generation(blocked_swag, style_rate):
             Decimal(".0001"), rounding=ROUND_UP
         )
     )
+
+
+def _round_up(scaled):
+    # Arrondi supérieur de valeurs déjà multipliées par leur unité, et les
+    # valeurs trop proches d'un entier pour que l'arrondi soit sûr
+    units = np.ceil(scaled)
+    unsure = (units - scaled < ROUNDING_MARGIN) | (units - scaled > 1 - ROUNDING_MARGIN)
+    return units.astype(np.int64), unsure
+
+
+def unit_style_generations(blocked_swag, style_rates):
+    """Version vectorisée de `unit_style_generation`.
+
+    Args:
+        blocked_swag (ndarray): $wag bloqués de chaque utilisateur.
+        style_rates (ndarray): taux de croissance de chaque utilisateur.
+
+    Returns:
+        Tuple[ndarray, ndarray]: $tyle généré pour chaque utilisateur, en
+            dix-millièmes, et les utilisateurs dont le résultat est incertain
+            et doit être recalculé par `unit_style_generation`.
+    """
+    return _round_up(
+        STYLA
+        * log1p(STYLB * blocked_swag)
+        * style_rates
+        / 100
+        / (BLOCKING_TIME * 24)
+        * 10_000
+    )
+
+
+def growth_rate(rank, n):
+    # Fonction mathématique, qui permet au premier d'avoir toujours
+    # 50%, et à celui à la moitié du classement 10%
+    return Decimal(100 + 10 / 3 * (pow(16, 1 - rank / n) - 1)).quantize(
+        Decimal(".01"), rounding=ROUND_UP
+    )
+
+
+def growth_rates(n):
+    """Version vectorisée de `growth_rate`, pour tous les rangs de 0 à n - 1.
+
+    Returns:
+        Tuple[ndarray, ndarray]: taux de chaque rang, en centièmes, et les rangs
+            dont le résultat est incertain et doit être recalculé par
+            `growth_rate`.
+    """
+    return _round_up((100 + 10 / 3 * (np.power(16.0, 1 - np.arange(n) / n) - 1)) * 100)
@@ -189,15 +189,21 @@ async def update_forbes_classement(guild, swag_client, client):
     # Récupération du canal #$wag-forbes
     channel_forbes = guild.get_channel(FORBES_CHANNEL_ID)
 
+    # Récupération du classement complet
+    forbes = swag_client.swagchain.forbes
+
     # Slow, dirty, and would need a function. Just what we love.
-    for user_id, _ in swag_client.swagchain.forbes:
+    account_deleted = False
+    for user_id, _ in forbes:
         if client.get_user(user_id.id) is None:
             await swag_client.swagchain.append(
                 AccountDeletion(issuer_id=client.user.id, user_id=user_id)
             )
+            account_deleted = True
 
-    # Récupération du classement complet
-    forbes = swag_client.swagchain.forbes
+    # Le classement n'est reconstruit que si des comptes l'ont quitté
+    if account_deleted:
+        forbes = swag_client.swagchain.forbes
 
     # Récupération de la liste des cagnottes
     cagnottes = list(swag_client.swagchain.cagnottes)
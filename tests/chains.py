@@ -0,0 +1,76 @@
+"""Chaînes de test, construites sans passer par Discord."""
+
+import os
+from types import SimpleNamespace
+
+from attr import asdict
+
+from bench.chain_generator import avatar_url
+from swag.blockchain.block_log import BlockLog
+from swag.blockchain.synced_blockchain import SyncedSwagChain, message_payload
+from swag.blocks import AssetUploadBlock
+
+BOT_ID = 0
+
+
+def message(message_id, block):
+    """Message du canal qui publie `block`, avec l'avatar s'il en envoie un."""
+    attachments = []
+    if isinstance(block, AssetUploadBlock):
+        attachments.append(SimpleNamespace(url=avatar_url(block.asset_key)))
+    return SimpleNamespace(
+        id=message_id,
+        content=message_payload([block])["content"],
+        attachments=attachments,
+    )
+
+
+class Channel:
+    """Canal de la $wagChain™ qui publie des blocs, un par message.
+
+    La lecture de l'historique échoue après `fail_after` messages.
+    """
+
+    def __init__(self, blocks, fail_after=None):
+        self.messages = [
+            message(message_id, block) for message_id, block in enumerate(blocks, 1)
+        ]
+        self.fail_after = fail_after
+
+    async def history(self, limit=None, oldest_first=False):
+        for i, channel_message in enumerate(self.messages):
+            if i == self.fail_after:
+                raise ConnectionError("historique interrompu")
+            yield channel_message
+
+
+def logged_chain(directory) -> SyncedSwagChain:
+    """Chaîne synchronisée vide, avec son journal, son snapshot et ses
+    sauvegardes dans `directory`."""
+    chain = SyncedSwagChain([], BOT_ID)
+    chain._log = BlockLog(os.path.join(directory, "swagchain.log"))
+    chain._snapshot_path = os.path.join(directory, "swagchain.snapshot")
+    chain._backup_dir = os.path.join(directory, "backups")
+    return chain
+
+
+def import_blocks(chain: SyncedSwagChain, blocks, first_message_id=1):
+    """Ajoute des blocs comme s'ils étaient lus dans le canal, un par message."""
+    for message_id, block in enumerate(blocks, first_message_id):
+        chain._import_message(message(message_id, block), [block])
+    chain._log.sync()
+
+
+def fingerprint(chain):
+    """Blocs et comptes d'une chaîne, pour comparer deux chaînes."""
+    return (
+        [(seq, chain._chain.encoded(seq)) for seq in chain._chain],
+        {
+            key: asdict(
+                account,
+                filter=lambda attribute, _: attribute.eq,
+                retain_collection_types=True,
+            )
+            for key, account in chain._accounts.items()
+        },
+    )
@@ -0,0 +1,14 @@
+import json
+import os
+import sys
+import tempfile
+
+# `utils` lit le `config.json` du répertoire courant dès son import : les
+# tests tournent dans un répertoire temporaire, avec une configuration vide
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_directory = tempfile.TemporaryDirectory()
+os.chdir(_directory.name)
+with open("config.json", "w") as config:
+    json.dump({}, config)
@@ -0,0 +1,100 @@
+from arrow import Arrow
+
+from swag.blockchain.blockchain import SwagChain
+from swag.blocks import (
+    AccountCreation,
+    AccountDeletion,
+    CagnotteCreation,
+    Mining,
+    StyleGeneration,
+    SwagBlocking,
+)
+from swag.currencies import Swag
+from swag.id import UserId
+from swag.stylog import growth_rate
+
+START = Arrow(2024, 1, 1)
+
+
+def chain_with_users(n: int, columns: bool = False) -> SwagChain:
+    chain = SwagChain([])
+    if columns:
+        chain._accounts.enable_columns()
+    chain.append(
+        CagnotteCreation(
+            timestamp=START, issuer_id=0, cagnotte_id="€", name="dev", creator=0
+        )
+    )
+    for user_id in range(1, n + 1):
+        timestamp = START.shift(minutes=user_id)
+        chain.append(
+            AccountCreation(
+                timestamp=timestamp,
+                issuer_id=user_id,
+                user_id=user_id,
+                timezone="Europe/Paris",
+            )
+        )
+        chain.append(
+            Mining(
+                timestamp=timestamp.shift(hours=1), issuer_id=user_id, user_id=user_id
+            )
+        )
+    return chain
+
+
+def delete(chain: SwagChain, user_id: int):
+    chain.append(
+        AccountDeletion(timestamp=START.shift(days=1), issuer_id=0, user_id=user_id)
+    )
+
+
+def test_deleted_account_leaves_forbes():
+    chain = chain_with_users(5)
+    delete(chain, 3)
+
+    ranking = [user_id for user_id, _ in chain.forbes]
+    assert sorted(ranking) == [UserId(user_id) for user_id in (1, 2, 4, 5)]
+
+    # Les taux suivent le classement des seuls comptes restants
+    chain.update_growth_rates()
+    forbes = chain.forbes
+    balances = [account.swag_balance for _, account in forbes]
+    assert balances == sorted(balances, reverse=True)
+    assert [account.style_rate for _, account in forbes] == [
+        growth_rate(rank, 4) for rank in range(4)
+    ]
+
+
+def test_deleted_account_leaves_view_cache():
+    chain = chain_with_users(3)
+    chain.account(2)
+    delete(chain, 2)
+
+    assert UserId(2) not in chain._views
+
+
+def test_deleted_account_leaves_columns():
+    chain = chain_with_users(5, columns=True)
+    for user_id in range(1, 6):
+        chain.append(
+            SwagBlocking(
+                timestamp=START.shift(hours=2),
+                issuer_id=user_id,
+                user_id=user_id,
+                amount=Swag(1),
+            )
+        )
+    chain.update_growth_rates()
+    delete(chain, 3)
+
+    columns = chain._accounts.columns
+    assert columns.user_ids == list(chain._accounts.users)
+    assert UserId(3) not in chain._style_amounts()
+    chain.append(
+        StyleGeneration(
+            timestamp=START.shift(days=1, hours=1),
+            issuer_id=0,
+            amounts=chain._style_amounts(),
+        )
+    )
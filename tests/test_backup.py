@@ -0,0 +1,59 @@
+import asyncio
+
+from bench.chain_generator import generate_chain
+from swag.blockchain.backup import load_manifest
+from swag.blockchain.blockchain import SwagChain
+
+from .chains import fingerprint, import_blocks, logged_chain
+
+
+def backup_kinds(chain):
+    return [segment["kind"] for segment in load_manifest(chain._backup_dir)["segments"]]
+
+
+def assert_restored(chain):
+    restored = SwagChain.from_backup(chain._backup_dir)
+    assert fingerprint(restored) == fingerprint(chain)
+    assert restored._assets == chain._assets
+
+
+def test_backups_restore_live_state(tmp_path):
+    blocks = generate_chain(30, 12, seed=1)
+    quarter = len(blocks) // 4
+    chain = logged_chain(tmp_path)
+
+    import_blocks(chain, blocks[:quarter])
+    asyncio.run(chain.save_backup())
+
+    import_blocks(chain, blocks[quarter : 2 * quarter], first_message_id=quarter + 1)
+    asyncio.run(chain.clean_old_style_gen_block())
+    asyncio.run(chain.save_backup())
+
+    import_blocks(chain, blocks[2 * quarter :], first_message_id=2 * quarter + 1)
+    asyncio.run(chain.save_backup())
+
+    assert backup_kinds(chain) == ["full", "incremental", "incremental"]
+    assert_restored(chain)
+
+
+def test_backups_stay_incremental_across_compaction(tmp_path):
+    blocks = generate_chain(30, 12, seed=2)
+    cuts = [0, len(blocks) // 2, 3 * len(blocks) // 4, len(blocks) - 10, len(blocks)]
+    parts = [blocks[start:end] for start, end in zip(cuts, cuts[1:])]
+    chain = logged_chain(tmp_path)
+
+    import_blocks(chain, parts[0])
+    asyncio.run(chain.save_backup())
+
+    # Deux compactions, qui réécrivent le journal, entre deux sauvegardes
+    for start, part in zip(cuts[1:3], parts[1:3]):
+        import_blocks(chain, part, first_message_id=start + 1)
+        asyncio.run(chain.clean_old_style_gen_block())
+        replaced_seqs, _ = asyncio.run(chain.compact_style_gen_blocks())
+        assert replaced_seqs
+
+    import_blocks(chain, parts[3], first_message_id=cuts[3] + 1)
+    asyncio.run(chain.save_backup())
+
+    assert backup_kinds(chain) == ["full", "incremental"]
+    assert_restored(chain)
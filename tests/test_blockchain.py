@@ -0,0 +1,125 @@
+import pytest
+
+from bench.chain_generator import CAGNOTTE_ID, generate_chain, replay_chain
+from swag.artefacts.services import NoEffect, Subscription
+from swag.blocks import (
+    AccountCreation,
+    AccountDeletion,
+    ReturnOnInvestment,
+    StyleGeneration,
+    Transaction,
+    YfuPowerActivation,
+)
+from swag.currencies import Style, Swag
+from swag.errors import NotEnoughSwagInBalance
+
+from .chains import fingerprint
+
+
+def test_refused_group_restores_state():
+    chain = replay_chain(generate_chain(30, 6, seed=4))
+    chain._accounts.enable_columns()
+    (first, _), (second, _), *_ = chain.forbes
+    first_swag = chain._accounts[first].swag_balance
+
+    expected = fingerprint(chain)
+    ranking = chain._accounts.forbes.checkpoint()
+    columns = chain._accounts.columns
+
+    with pytest.raises(NotEnoughSwagInBalance):
+        chain.append_many(
+            [
+                Transaction(
+                    issuer_id=first, giver_id=first, recipient_id=second, amount=Swag(1)
+                ),
+                Transaction(
+                    issuer_id=first,
+                    giver_id=first,
+                    recipient_id=CAGNOTTE_ID,
+                    amount=first_swag,
+                ),
+            ]
+        )
+
+    assert fingerprint(chain) == expected
+    assert chain._accounts.forbes.checkpoint() == ranking
+    assert columns.user_ids == list(chain._accounts.users)
+    assert all(
+        columns.blocked_swag[account._row] == account.blocked_swag.value
+        for account in chain._accounts.users.values()
+    )
+    assert [user_id for user_id, _ in chain.forbes[:2]] == [first, second]
+
+
+def test_refused_group_keeps_services_shared():
+    chain = replay_chain(generate_chain(10, 4, seed=5))
+    subscriber, other = list(chain._accounts.users)[:2]
+    service = NoEffect(
+        cagnotte_id=CAGNOTTE_ID, name="Club", costs=[Subscription(amount=Swag(1))]
+    )
+    chain._accounts[CAGNOTTE_ID].services.append(service)
+    service.execute(chain, subscriber)
+    service.execute(chain, other)
+
+    with pytest.raises(NotEnoughSwagInBalance):
+        chain.append_many(
+            [
+                Transaction(
+                    issuer_id=subscriber,
+                    giver_id=subscriber,
+                    recipient_id=CAGNOTTE_ID,
+                    amount=amount,
+                )
+                for amount in (Swag(1), chain._accounts[subscriber].swag_balance)
+            ]
+        )
+
+    # Comme après un paiement refusé dans `Service.handle_payments`
+    services = chain._accounts[CAGNOTTE_ID].services
+    services[services.index(service)].cancel(chain, subscriber)
+
+    assert services[0] is service
+    assert service.beneficiaries == [other]
+    assert chain._accounts[subscriber].subscribed_services == set()
+    (subscribed,) = chain._accounts[other].subscribed_services
+    assert subscribed is service
+
+
+def open_period_generations(chain, user_id):
+    """StyleGeneration de `user_id` depuis le dernier bloc qui a lu ou remis à
+    zéro son $tyle en attente, et leurs montants."""
+    generations = []
+    for seq in chain._chain:
+        block = chain._chain[seq]
+        if isinstance(block, StyleGeneration) and user_id in block.amounts:
+            generations.append((seq, block.amounts[user_id]))
+        elif isinstance(block, YfuPowerActivation) or (
+            isinstance(block, (ReturnOnInvestment, AccountCreation, AccountDeletion))
+            and block.user_id == user_id
+        ):
+            generations = []
+    return generations
+
+
+def test_compaction_keeps_open_periods():
+    chain = replay_chain(generate_chain(30, 12, seed=2))
+    blocking_users = [
+        user_id
+        for user_id, account in chain._accounts.users.items()
+        if account.pending_style > Style(0)
+    ]
+    assert blocking_users
+    expected = {
+        user_id: open_period_generations(chain, user_id) for user_id in blocking_users
+    }
+    state = fingerprint(chain)[1]
+
+    replaced_seqs, removed_seqs = chain.compact_style_gen_blocks()
+
+    assert replaced_seqs and removed_seqs
+    for user_id in blocking_users:
+        assert open_period_generations(chain, user_id) == expected[user_id]
+    assert (
+        fingerprint(replay_chain([chain._chain[seq] for seq in chain._chain]))[1]
+        == state
+    )
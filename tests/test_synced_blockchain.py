@@ -0,0 +1,148 @@
+import asyncio
+import os
+
+import disnake
+import pytest
+from arrow import Arrow
+
+from bench.chain_generator import generate_chain
+from bench.fake_channel import FakeChannel, FakeResponse
+from swag.blockchain.block_log import BlockLog
+from swag.blockchain.synced_blockchain import (
+    SyncedSwagChain,
+    decode_payload,
+    fetch_payload,
+)
+from swag.blockchain.wire_format import encode_block
+from swag.blocks import AccountCreation, AssetUploadBlock
+from swag.id import UserId
+
+from .chains import BOT_ID, Channel, fingerprint, import_blocks, logged_chain
+
+
+async def open_chain(directory, channel):
+    chain = await SyncedSwagChain.from_channel(
+        BOT_ID,
+        channel,
+        snapshot_path=os.path.join(directory, "swagchain.snapshot"),
+        log_path=os.path.join(directory, "swagchain.log"),
+    )
+    chain._mirror_task.cancel()
+    chain._log.close()
+    return chain
+
+
+def test_interrupted_import_is_restarted(tmp_path):
+    blocks = generate_chain(10, 4, seed=3)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(open_chain(tmp_path, Channel(blocks, fail_after=len(blocks) // 2)))
+
+    log = BlockLog(os.path.join(tmp_path, "swagchain.log"))
+    assert log.is_empty
+    log.close()
+
+    chain = asyncio.run(open_chain(tmp_path, Channel(blocks)))
+    os.mkdir(os.path.join(tmp_path, "expected"))
+    expected = logged_chain(os.path.join(tmp_path, "expected"))
+    import_blocks(expected, blocks)
+    assert fingerprint(chain) == fingerprint(expected)
+
+    # Le journal complet est rejoué au démarrage suivant
+    replayed = asyncio.run(open_chain(tmp_path, Channel([])))
+    assert fingerprint(replayed) == fingerprint(expected)
+
+
+def test_log_replay_after_compaction(tmp_path):
+    chain = logged_chain(tmp_path)
+    import_blocks(chain, generate_chain(30, 12, seed=2))
+    replaced_seqs, _ = asyncio.run(chain.compact_style_gen_blocks())
+    assert replaced_seqs
+    chain._log.close()
+
+    # Sans snapshot, tout l'état vient du journal réécrit
+    os.remove(chain._snapshot_path)
+    replayed = logged_chain(tmp_path)
+    replayed._replay_log()
+
+    assert fingerprint(replayed) == fingerprint(chain)
+    assert replayed._assets == chain._assets
+    assert dict(replayed._messages.messages()) == dict(chain._messages.messages())
+
+
+class RejectingChannel(FakeChannel):
+    """Canal qui répond d'abord par une erreur du serveur, puis refuse tout
+    message qui publie un bloc de `rejected_user`."""
+
+    def __init__(self, rejected_user):
+        super().__init__()
+        self.rejected_user = UserId(rejected_user)
+        self.server_errors = 1
+
+    async def send(self, content=None, **kwargs):
+        if self.server_errors:
+            self.server_errors -= 1
+            raise disnake.DiscordServerError(FakeResponse(503, "Unavailable"), "")
+        if any(
+            block.user_id == self.rejected_user for block in decode_payload(content)
+        ):
+            raise disnake.Forbidden(FakeResponse(403, "Forbidden"), "refusé")
+        return await super().send(content, **kwargs)
+
+
+def test_mirror_skips_only_rejected_blocks(tmp_path):
+    async def mirror():
+        chain = logged_chain(tmp_path)
+        chain._channel = RejectingChannel(rejected_user=2)
+        chain._mirror_task = asyncio.create_task(chain._mirror())
+        for user_id in (1, 2, 3):
+            await chain.append(
+                AccountCreation(
+                    timestamp=Arrow(2024, 1, 1),
+                    issuer_id=user_id,
+                    user_id=user_id,
+                    timezone="UTC",
+                )
+            )
+        await chain.flush()
+        chain._mirror_task.cancel()
+        return chain
+
+    chain = asyncio.run(mirror())
+
+    assert list(chain._failed_seqs) == [1]
+    assert sorted(chain._messages.seqs()) == [0, 2]
+
+
+def test_compaction_during_send_rewrites_stale_messages(tmp_path):
+    blocks = generate_chain(30, 12, seed=2)
+    for block in blocks:
+        if isinstance(block, AssetUploadBlock):
+            os.makedirs(os.path.dirname(block.local_path), exist_ok=True)
+            with open(block.local_path, "wb") as file:
+                file.write(b"avatar")
+
+    async def compact_while_sending():
+        chain = logged_chain(tmp_path)
+        chain._channel = FakeChannel(latency=0.01)
+        chain._mirror_task = asyncio.create_task(chain._mirror())
+        for block in blocks:
+            await chain.append(block)
+
+        # Les premiers blocs sont en cours d'envoi pendant la compaction
+        await asyncio.sleep(0.005)
+        replaced_seqs, removed_seqs = await chain.compact_style_gen_blocks()
+        await chain.flush()
+        chain._mirror_task.cancel()
+
+        published = []
+        for message_id in sorted(chain._channel.messages):
+            message = chain._channel.messages[message_id]
+            published += decode_payload(await fetch_payload(message))
+        return chain, replaced_seqs, removed_seqs, published
+
+    chain, replaced_seqs, removed_seqs, published = asyncio.run(compact_while_sending())
+    assert replaced_seqs and removed_seqs
+    assert [encode_block(block) for block in published] == [
+        chain._chain.encoded(seq) for seq in chain._chain
+    ]
@@ -0,0 +1,52 @@
+import json
+
+from bench.chain_generator import generate_chain, replay_chain
+from swag.blockchain.blockchain_parser import (
+    converter,
+    structure_block,
+    unstructure_block,
+)
+from swag.blockchain.synced_blockchain import decode_payload
+from swag.blockchain.wire_format import decode_block, encode_block
+from swag.blocks import Mining
+
+
+def test_mining_harvest_round_trip():
+    blocks = generate_chain(10, 4, seed=1)
+    chain = replay_chain(blocks)
+    user_id = next(iter(chain._accounts.users))
+    mining = Mining(
+        timestamp=blocks[-1].timestamp.shift(days=1),
+        issuer_id=user_id,
+        user_id=user_id,
+    )
+    chain.append(mining)
+    assert mining.harvest
+
+    assert decode_block(encode_block(mining)).harvest == mining.harvest
+
+    # Bloc publié au format JSON, puis réencodé dans le journal
+    unstructured = {"block_type": "Mining", **converter.unstructure(mining)}
+    (legacy_block,) = decode_payload(json.dumps(unstructured))
+    logged_block = decode_block(encode_block(legacy_block))
+
+    assert legacy_block.harvest == unstructured["harvest"]
+    assert logged_block.harvest == legacy_block.harvest
+    assert logged_block.amount == mining.amount
+
+    # Minage publié avant l'enregistrement des tirages
+    no_harvest = Mining(
+        timestamp=mining.timestamp,
+        issuer_id=user_id,
+        user_id=user_id,
+        amount=mining.amount,
+    )
+    assert decode_block(encode_block(no_harvest)).harvest is None
+
+
+def test_legacy_json_blocks_decode_like_wire_blocks():
+    blocks = generate_chain(20, 6, seed=3)
+
+    for block in blocks:
+        legacy_block = structure_block(json.loads(json.dumps(unstructure_block(block))))
+        assert encode_block(legacy_block) == encode_block(block)
@@ -37,6 +37,11 @@ TENOR_API_KEY = client_config.get("tenor_api_key")
 # ID unique du canal des jeux
 GAME_CHANNEL_ID = client_config.get("game_channel", None)
 
+# Profilage de l'ajout des blocs à la $wagChain dès le démarrage, et de la
+# mémoire qu'ils allouent
+BLOCK_PROFILER = client_config.get("block_profiler", False)
+BLOCK_PROFILER_ALLOCATIONS = client_config.get("block_profiler_allocations", False)
+
 
 def format_number(n):
     """Fonction qui permet de rajouter des espaces fin entre chaque